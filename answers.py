@@ -0,0 +1,64 @@
+import re
+import unicodedata
+
+FEATURE_CLAUSE = re.compile(r"[\(\[]\s*(?:feat|ft|featuring)\b\.?[^\)\]]*[\)\]]|\s(?:feat|ft|featuring)\b\.?\s.*$")
+VERSION_SUFFIX = re.compile(
+    r"[\(\[][^\)\]]*\b(?:remaster(?:ed)?|live)\b[^\)\]]*[\)\]]"
+    r"|\s[-–—]\s.*\b(?:remaster(?:ed)?|live)\b.*$"
+)
+APOSTROPHES = re.compile(r"['’‘`]")
+PUNCTUATION = re.compile(r"[^\w\s]|_")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = FEATURE_CLAUSE.sub(" ", text)
+    text = VERSION_SUFFIX.sub(" ", text)
+    text = text.replace("&", " and ")
+    text = APOSTROPHES.sub("", text)
+    text = PUNCTUATION.sub(" ", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+class AnswerIndex:
+    # Maps every normalized alias to the keys of the answers it names, so a
+    # guess costs one normalize() and one dict lookup however big the catalog.
+
+    def __init__(self):
+        self._aliases = {}
+
+    def __len__(self):
+        return len(self._aliases)
+
+    def add(self, key, title: str, aliases=()):
+        self.add_normalized(key, map(normalize, (title, *aliases)))
+
+    def add_normalized(self, key, aliases):
+        # Like add(), for aliases that have already been through normalize().
+        for normalized in aliases:
+            if not normalized:
+                continue
+            keys = self._aliases.get(normalized, ())
+            if key not in keys:
+                self._aliases[normalized] = keys + (key,)
+
+    def update(self, items):
+        # Takes (normalized alias, keys) pairs as produced by items(), e.g. to
+        # rebuild an index in another process without normalizing again.
+        self._aliases.update(items)
+
+    def __iter__(self):
+        return iter(self._aliases)
+
+    def items(self):
+        return self._aliases.items()
+
+    def get(self, normalized: str) -> tuple:
+        return self._aliases.get(normalized, ())
+
+    def lookup(self, guess: str) -> tuple:
+        return self._aliases.get(normalize(guess), ())
+
+    def matches(self, guess: str, key) -> bool:
+        return key in self.lookup(guess)
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+
+
+class Attempt:
+    __slots__ = ("count", "expires")
+
+    def __init__(self, count: int, expires: float):
+        self.count = count
+        self.expires = expires
+
+
+class AttemptStore:
+    # Attempt counters keyed by user id. Every touch refreshes an entry's TTL
+    # and moves it to the back, so the front always holds the entries that
+    # expire first and both TTL and LRU eviction just pop from the front.
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 3600, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        self._expire(self.clock())
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return self.get(user_id) > 0
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            user_id, entry = next(iter(entries.items()))
+            if entry.expires > now:
+                break
+            del entries[user_id]
+
+    def get(self, user_id) -> int:
+        now = self.clock()
+        self._expire(now)
+        entry = self._entries.get(user_id)
+        return entry.count if entry is not None else 0
+
+    def set(self, user_id, count: int):
+        now = self.clock()
+        self._expire(now)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self._entries[user_id] = Attempt(count, now + self.ttl)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        else:
+            entry.count = count
+            entry.expires = now + self.ttl
+            self._entries.move_to_end(user_id)
+
+    def increment(self, user_id) -> int:
+        count = self.get(user_id) + 1
+        self.set(user_id, count)
+        return count
+
+    def pop(self, user_id) -> int:
+        entry = self._entries.pop(user_id, None)
+        return entry.count if entry is not None else 0
+
+    def items(self):
+        self._expire(self.clock())
+        return [(user_id, entry.count) for user_id, entry in self._entries.items()]
@@ -0,0 +1,29 @@
+from array import array
+from bisect import bisect_left
+
+from answers import AnswerIndex, normalize
+
+
+class PrefixIndex:
+    # Every normalized alias from the AnswerIndex in one sorted list, with
+    # its track index in a parallel array. A prefix query is a binary search
+    # to the first match and a short forward scan, so it costs O(log n + limit).
+
+    def __init__(self, answers: AnswerIndex):
+        pairs = sorted((alias, index) for alias, indexes in answers.items() for index in indexes)
+        self._keys = [key for key, _ in pairs]
+        self._indexes = array("I", (index for _, index in pairs))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def complete(self, prefix: str, limit: int = 25) -> list:
+        normalized = normalize(prefix)
+        keys, indexes = self._keys, self._indexes
+        found = []
+        position = bisect_left(keys, normalized)
+        while position < len(keys) and len(found) < limit and keys[position].startswith(normalized):
+            if indexes[position] not in found:
+                found.append(indexes[position])
+            position += 1
+        return found
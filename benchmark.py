@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from client_profile import max_rss_mib
+from metrics import QUANTILES, Histogram
+from ratelimit import RateLimiter
+
+
+class FakeResponse:
+    # Stands in for discord.InteractionResponse and the follow-up webhook;
+    # each call sleeps to simulate the Discord round trip. With no latency
+    # that is sleep(0), which still yields to the loop like real I/O would.
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = None
+
+    async def send_message(self, embed=None, ephemeral=False, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent = embed
+
+    async def defer(self, **kwargs):
+        await asyncio.sleep(self.latency)
+
+    async def send(self, embed=None, **kwargs):
+        await self.send_message(embed)
+
+
+def fake_interaction(user_id: int, guild_id: int, latency: float):
+    response = FakeResponse(latency)
+    return SimpleNamespace(
+        user=SimpleNamespace(id=user_id),
+        guild_id=guild_id,
+        channel_id=guild_id,
+        response=response,
+        followup=response,
+    )
+
+
+def typo(title: str) -> str:
+    if len(title) < 2:
+        return title
+    i = random.randrange(len(title) - 1)
+    return title[:i] + title[i + 1] + title[i] + title[i + 2:]
+
+
+def attempt_entries(bot) -> int:
+    return sum(len(session.attempts) for session in bot.sessions)
+
+
+async def run(args):
+    # bot.py reads config.json and builds every index on import. It never
+    # logs in here, so any token will do.
+    sys.argv = sys.argv[:1]
+    os.environ.setdefault("DISCORD_TOKEN", "offline-benchmark")
+    import bot
+
+    if not args.rate_limit:
+        bot.limiter = RateLimiter(1e9, 1e9, 1e9, 1e9)
+    await bot.state.start()
+    if bot.store is not None:
+        bot.store.start()
+    deferred = bot.settings.guess_response == "deferred"
+    if deferred:
+        bot.guess_pool.start()
+
+    titles = [bot.catalog[random.randrange(len(bot.catalog))].title for _ in range(1000)]
+    latencies = Histogram("benchmark_seconds", "Latency of each /guess call.")
+    remaining = iter(range(args.guesses))
+
+    async def player():
+        for _ in remaining:
+            roll = random.random()
+            if roll < args.correct:
+                song = random.choice(titles)
+            elif roll < args.correct + args.typos:
+                song = typo(random.choice(titles))
+            else:
+                song = f"wrong guess {random.randrange(1_000_000)}"
+            interaction = fake_interaction(random.randrange(args.users), random.randrange(1, args.guilds + 1), args.latency)
+            started = time.perf_counter_ns()
+            await bot.guess.callback(interaction, song)
+            latencies.record_ns(time.perf_counter_ns() - started)
+
+    entries_before = attempt_entries(bot) if bot.backend == "memory" else 0
+    if args.trace_memory:
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    await asyncio.gather(*(player() for _ in range(args.concurrency)))
+    if deferred:
+        await bot.guess_pool.join()
+    elapsed = time.perf_counter() - started
+    if args.trace_memory:
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # Dropped guesses (and deferred ones that timed out) never got an answer,
+    # so they don't count towards throughput.
+    counts = bot.outcomes.values
+    answered = sum(count for outcome, count in counts.items() if outcome != "dropped")
+    print(f"{args.guesses} guesses in {elapsed:.2f}s: {answered / elapsed:,.0f} answered/s")
+    unanswered = args.guesses - answered
+    if unanswered:
+        print(f"unanswered: {counts.get('dropped', 0)} dropped, {unanswered - counts.get('dropped', 0)} timed out")
+    # In deferred mode this is the time to acknowledge, not to answer.
+    print("latency: " + ", ".join(f"p{q * 100:g} {latencies.quantile(q) * 1000:.3f}ms" for q in QUANTILES))
+    print("outcomes: " + ", ".join(f"{outcome} {count}" for outcome, count in bot.outcomes.values.items()))
+    if bot.backend == "memory":
+        entries = attempt_entries(bot)
+        print(f"attempts: {entries} entries (+{entries - entries_before}) across {len(bot.sessions)} sessions")
+    if args.trace_memory:
+        print(f"memory: +{(memory_after - memory_before) / 1024:,.0f} KiB retained, {memory_peak / 1024:,.0f} KiB peak")
+    if max_rss_mib() is not None:
+        print(f"peak RSS: {max_rss_mib():.1f} MiB")
+
+    await bot.guess_pool.close()
+    if bot.match_pool is not None:
+        bot.match_pool.close()
+    await bot.state.close()
+    if bot.store is not None:
+        bot.store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive /guess offline with fake interactions and report its performance.")
+    parser.add_argument("--guesses", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--correct", type=float, default=0.05, help="share of guesses naming a catalog title")
+    parser.add_argument("--typos", type=float, default=0.05, help="share of guesses naming a catalog title with a typo")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated send_message round trip in seconds")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the configured guess rate limits")
+    parser.add_argument("--trace-memory", action="store_true", help="measure allocations with tracemalloc (slows the run)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,425 @@
-import json
+import time
+
+# Taken before any other import so the startup report can include them.
+IMPORTS_STARTED = time.perf_counter()
+
+import argparse
+import asyncio
+import heapq
+from typing import Literal
+
+import aiohttp
 import discord
+from discord import app_commands
 from discord.ext import commands
 
-with open("config.json") as f:
-    config = json.load(f)
+import embeds
+from answers import AnswerIndex
+from attempts import AttemptStore
+from autocomplete import PrefixIndex
+from catalog import Catalog, Track, answer_columns
+from client_profile import cache_report, client_options
+from cluster import parse_shards, shard_for_guild
+from command_sync import sync_if_changed
+from leaderboard import GLOBAL
+from lyrics import ClueCache, ClueService, FixtureProvider
+from matching import Matcher
+from metrics import Metrics
+from offload import MatchPool
+from persistence import GameStore
+from ratelimit import RateLimiter
+from rounds import RoundTimer
+from scheduler import LANES, RequestScheduler
+from selection import Selector
+from sessions import SessionManager
+from settings import StartupTimer, load_settings
+from spotify import SpotifyClient, SpotifyError
+from state import MemoryBackend, RedisBackend, SQLiteBackend
+from workers import WorkerPool
+
+startup = StartupTimer()
+startup.start("imports", IMPORTS_STARTED)
+startup.stop("imports")
+
+with startup.phase("config"):
+    settings = load_settings("config.json")
+
+MAX_ATTEMPTS = 3
+WIN_POINTS = 1
+LEADERBOARD_SIZE = 10
+
+class GuessBot(commands.AutoShardedBot if settings.sharded else commands.Bot):
+    force_sync = False
+
+    async def login(self, token: str):
+        startup.start("login")
+        await super().login(token)
 
-TOKEN = config["DISCORD_TOKEN"]
-BOT_ID = config["DISCORD_BOT_ID"]
+    async def setup_hook(self):
+        startup.stop("login")
+        # In a cluster only the process running shard 0 syncs commands.
+        shard_ids = getattr(self, "shard_ids", None)
+        if shard_ids is None or 0 in shard_ids:
+            with startup.phase("command sync"):
+                synced = await sync_if_changed(self.tree, settings.sync_fingerprint_path, self.force_sync)
+            if synced is None:
+                print("Commands unchanged, skipped sync")
+            else:
+                print(f"Synced {len(synced)} commands")
+        if store is not None:
+            store.start()
+        await state.start()
+        if settings.metrics_port:
+            await metrics.serve(settings.metrics_host, settings.metrics_port)
+        if spotify is not None:
+            # Nothing in the bot needs Spotify to answer commands, so bad
+            # credentials or an outage shouldn't keep it offline. The client
+            # fetches a token on demand once Spotify is reachable again.
+            try:
+                await spotify.start()
+            except (SpotifyError, aiohttp.ClientError, asyncio.TimeoutError) as error:
+                print(f"Spotify unavailable, continuing without a token: {error!r}")
+        rounds.start()
+        if settings.guess_response == "deferred":
+            guess_pool.start()
+        if clue_service is not None and popular:
+            self.precompute = asyncio.create_task(clue_service.precompute(catalog[index] for index in popular))
+        startup.start("gateway connect")
 
-bot = commands.Bot(
+    async def close(self):
+        await guess_pool.close()
+        if match_pool is not None:
+            match_pool.close()
+        await rounds.close()
+        await metrics.close()
+        await state.close()
+        if spotify is not None:
+            await spotify.close()
+        await super().close()
+
+bot = GuessBot(
     command_prefix=None,
     help_command=None,
     is_case_insensitive=True,
-    intents=discord.Intents.all(),
+    **client_options(settings.client_profile),
 )
 
-attempts = {}
+# Created before the catalog so the worker processes fork from a small parent.
+match_pool = None
+if settings.match_workers:
+    match_pool = MatchPool(settings.match_workers, settings.match_similarity, settings.match_batch_size)
+
+with startup.phase("catalog"):
+    if settings.catalog_path:
+        catalog = Catalog(settings.catalog_path)
+    else:
+        catalog = [Track("test-song", "test song")]
+
+    answers = AnswerIndex()
+    popularity = []
+    for index, (normalized, track_popularity) in enumerate(answer_columns(catalog)):
+        answers.add_normalized(index, normalized)
+        # Spotify popularity runs 0-100; the +1 keeps obscure tracks in play.
+        popularity.append(track_popularity + 1)
+    # With a match pool the workers hold the only Matcher.
+    matcher = None
+    if match_pool is None:
+        matcher = Matcher(answers, settings.match_similarity, answers=catalog.answers if settings.catalog_path else None)
+    else:
+        match_pool.load(answers, settings.catalog_path)
+    titles = PrefixIndex(answers)
+    selector = Selector(popularity, settings.selection_window)
+    # Clues are precomputed for the most popular tracks only: the cache
+    # can't hold the whole catalog, and filling it from everything would
+    # just evict the tracks rounds actually pick.
+    popular = []
+    if settings.lyrics_cache_path and settings.lyrics_fixtures:
+        popular = heapq.nlargest(settings.lyrics_precompute, range(len(popularity)), key=popularity.__getitem__)
+    del popularity
+
+limiter = RateLimiter(
+    settings.user_guess_rate,
+    settings.user_guess_burst,
+    settings.guild_guess_rate,
+    settings.guild_guess_burst,
+)
+
+sessions = SessionManager(
+    selector.pick,
+    lambda: AttemptStore(settings.attempts_max_users, settings.attempts_ttl),
+    settings.session_scope,
+)
 
-ANSWER = "test song"
+backend = settings.state_backend
+
+# With the memory backend, DATABASE_PATH only adds write-behind persistence;
+# the sqlite backend uses the same file as its live, shared state instead.
+store = None
+if settings.database_path and backend == "memory":
+    store = GameStore(settings.database_path, settings.database_flush_interval)
+
+def restore_sessions(shard_ids=None, shard_count=None):
+    # Each cluster worker only resumes rounds in guilds its shards own; DMs
+    # (guild 0) belong to shard 0.
+    for key, answer, started_at, users in store.load(settings.attempts_ttl):
+        if shard_ids is not None and shard_for_guild(key[0], shard_count) not in shard_ids:
+            continue
+        restored = sessions.start(key, answer, started_at)
+        for user_id, count in users:
+            restored.attempts.set(user_id, count)
+        if settings.round_duration:
+            # Guild-scoped keys don't say which channel to announce in.
+            rounds.schedule(key, started_at + settings.round_duration, (answer, key[1] or None))
+
+def restore_scores(shard_ids=None, shard_count=None):
+    # Like restore_sessions, guild boards only go to the worker that owns
+    # the guild. The global board is loaded everywhere.
+    for board, user_id, score in store.load_scores():
+        if board != GLOBAL and shard_ids is not None and shard_for_guild(board, shard_count) not in shard_ids:
+            continue
+        state.leaderboard.set(board, user_id, score)
+
+if backend == "memory":
+    state = MemoryBackend(sessions, store)
+elif backend == "sqlite":
+    state = SQLiteBackend(settings.database_path, settings.attempts_ttl)
+else:
+    state = RedisBackend(settings.redis_url, settings.attempts_ttl)
+
+spotify = None
+if settings.spotify_client_id:
+    spotify = SpotifyClient(
+        settings.spotify_client_id,
+        settings.spotify_client_secret.reveal(),
+        scheduler=RequestScheduler(settings.spotify_rate, settings.spotify_burst),
+    )
+
+clue_service = None
+if settings.lyrics_cache_path:
+    clue_service = ClueService(
+        ClueCache(settings.lyrics_cache_path, settings.lyrics_cache_bytes, settings.lyrics_memory_entries),
+        FixtureProvider(settings.lyrics_fixtures) if settings.lyrics_fixtures else None,
+    )
+
+async def expire_round(key: tuple, payload: tuple):
+    answer, channel_id = payload
+    # Another process (or a correct guess) may have ended it first.
+    if not await state.end_round(key, answer):
+        return
+    channel = bot.get_channel(channel_id) if channel_id is not None else None
+    if channel is not None:
+        track = catalog[answer]
+        try:
+            await channel.send(embed=embeds.times_up(track.title, track.artist))
+        except discord.HTTPException:
+            pass
+
+rounds = RoundTimer(expire_round)
+
+async def current_round(interaction: discord.Interaction) -> tuple:
+    key = sessions.key_for(interaction.guild_id, interaction.channel_id)
+    current = await state.get_round(key)
+    if current is not None and settings.round_duration and time.time() >= current[1] + settings.round_duration:
+        # Expired but the timer hasn't fired yet, e.g. right after a restart.
+        rounds.cancel(key)
+        await expire_round(key, (current[0], interaction.channel_id))
+        current = None
+    if current is None:
+        current = await state.claim_round(key, selector.pick(key), time.time())
+        if clue_service is not None:
+            clue_service.prefetch(catalog[current[0]])
+    if settings.round_duration:
+        # Also picks up rounds another process started; the deadline only
+        # depends on started_at, so every process agrees on it.
+        rounds.schedule(key, current[1] + settings.round_duration, (current[0], interaction.channel_id))
+    return (key, *current)
 
 @bot.event
 async def on_ready():
     print("Ready!")
-    synced = await bot.tree.sync()
-    print(f"Synced {len(synced)} commands")
+    if "gateway connect" not in startup.phases:
+        startup.stop("gateway connect")
+        print(startup.report())
+    print(cache_report(bot, settings.client_profile))
+
+metrics = Metrics()
+guess_seconds = metrics.histogram("guess_handler_seconds", "Time spent handling /guess, including the response.")
+state_seconds = metrics.histogram("guess_state_seconds", "Time spent in each state backend call made by /guess.")
+send_seconds = metrics.histogram("guess_send_seconds", "Round trip of the /guess response.")
+match_seconds = metrics.histogram("guess_match_seconds", "Time spent matching a guess, including any worker round trip.")
+outcomes = metrics.counter("guess_outcomes_total", "Handled /guess calls by outcome.", "outcome")
+if spotify is not None:
+    metrics.gauge(
+        "spotify_queue_depth", "Spotify calls waiting for a rate-limit token.", "lane",
+        lambda: {lane: spotify.scheduler.stats()[lane]["queued"] for lane in LANES},
+    )
+    metrics.gauge(
+        "spotify_wait_max_seconds", "Longest wait for a Spotify rate-limit token.", "lane",
+        lambda: {lane: spotify.scheduler.stats()[lane]["wait_max"] for lane in LANES},
+    )
+
+async def finish_round(key: tuple, answer, guild_id, user_id: int):
+    with state_seconds.time():
+        won = await state.end_round(key, answer)
+    # Only the guess that actually ended the round scores.
+    if won:
+        rounds.cancel(key)
+        with state_seconds.time():
+            await state.award(guild_id, user_id, WIN_POINTS)
+
+async def play_guess(interaction: discord.Interaction, song: str) -> tuple:
+    # Returns (outcome, embed).
+    user_id = interaction.user.id
+    with state_seconds.time():
+        key, answer, _ = await current_round(interaction)
+
+    with match_seconds.time():
+        if match_pool is not None:
+            # Exact aliases are one dict lookup here; only the rest are worth
+            # a round trip to a worker.
+            matched = answer in answers.lookup(song) or await match_pool.matches(song, answer)
+        else:
+            matched = matcher.matches(song, answer)
+
+    if matched:
+        # Shielded so a worker timeout can't end the round without paying
+        # out the win.
+        await asyncio.shield(finish_round(key, answer, interaction.guild_id, user_id))
+        return "correct", embeds.CORRECT
+
+    with state_seconds.time():
+        count = await state.record_miss(key, user_id, MAX_ATTEMPTS)
+
+    if not count:
+        return "late", embeds.ROUND_OVER
+
+    if count >= MAX_ATTEMPTS:
+        return "game_over", embeds.GAME_OVER
+
+    return "wrong", embeds.wrong_guess(MAX_ATTEMPTS - count)
 
 @bot.tree.command(
     name="guess",
     description="Guess the song from the lyrics. Requires spotify oauth connection.",
 )
 async def guess(interaction: discord.Interaction, song: str):
-    user_id = interaction.user.id
+    with guess_seconds.time():
+        if not limiter.allow(interaction.user.id, interaction.guild_id):
+            outcome = "throttled"
+            if settings.rate_limit_action == "reply":
+                with send_seconds.time():
+                    await interaction.response.send_message(embed=embeds.SLOW_DOWN, ephemeral=True)
+        elif settings.guess_response == "deferred":
+            # Acknowledge within Discord's 3 second window; a worker sends the
+            # answer as a follow-up and counts the outcome.
+            await interaction.response.defer()
+            outcome = "deferred"
+            if not guess_pool.submit(answer_guess, interaction, song):
+                outcome = "dropped"
+                await interaction.followup.send(embed=embeds.BUSY)
+        else:
+            outcome, embed = await play_guess(interaction, song)
+            with send_seconds.time():
+                await interaction.response.send_message(embed=embed)
+    if outcome != "deferred":
+        outcomes.inc(outcome)
+
+async def answer_guess(interaction: discord.Interaction, song: str):
+    outcome, embed = await play_guess(interaction, song)
+    with send_seconds.time():
+        await interaction.followup.send(embed=embed)
+    outcomes.inc(outcome)
+
+async def guess_timed_out(interaction: discord.Interaction, song: str):
+    await interaction.followup.send(embed=embeds.TOO_SLOW)
+
+guess_pool = WorkerPool(
+    settings.guess_workers,
+    settings.guess_queue_size,
+    settings.guess_timeout,
+    guess_timed_out,
+    metrics.counter("guess_deferred_total", "Deferred /guess jobs by result.", "result"),
+)
+metrics.gauge("guess_deferred_queue_depth", "Deferred /guess jobs waiting for a worker.", "pool", lambda: {"guess": len(guess_pool)})
+
+@guess.autocomplete("song")
+async def song_autocomplete(interaction: discord.Interaction, current: str):
+    choices = []
+    for index in titles.complete(current):
+        track = catalog[index]
+        name = f"{track.title} - {track.artist}" if track.artist else track.title
+        choices.append(app_commands.Choice(name=name[:100], value=track.title[:100]))
+    return choices
 
-    if user_id not in attempts:
-        attempts[user_id] = 0
-
-    if song.lower() == ANSWER.lower():
-        attempts.pop(user_id, None)
-        embed = discord.Embed(
-            title="Correct!",
-            description="You guessed the song.",
-            color=discord.Color.green()
-        )
-        await interaction.response.send_message(embed=embed)
+@bot.tree.command(
+    name="clue",
+    description="Show a lyrics clue for the current round.",
+)
+async def clue(interaction: discord.Interaction):
+    _, answer, started_at = await current_round(interaction)
+    track = catalog[answer]
+    clues = await clue_service.clues(track) if clue_service is not None else track.snippets
+
+    if not clues:
+        await interaction.response.send_message(embed=embeds.NO_CLUES, ephemeral=True)
         return
 
-    attempts[user_id] += 1
+    # A new clue unlocks every CLUE_INTERVAL seconds, the same in every process.
+    elapsed = time.time() - started_at
+    shown = min(int(elapsed // settings.clue_interval), len(clues) - 1)
+    await interaction.response.send_message(embed=embeds.clue(shown, len(clues), clues[shown]))
+
+@bot.tree.command(
+    name="leaderboard",
+    description="Show the best song guessers in this server or everywhere.",
+)
+async def leaderboard(interaction: discord.Interaction, scope: Literal["server", "global"] = "server"):
+    board = interaction.guild_id if scope == "server" and interaction.guild_id else GLOBAL
+    rows = await state.top(board, LEADERBOARD_SIZE)
+    if not rows:
+        await interaction.response.send_message(embed=embeds.NO_SCORES, ephemeral=True)
+        return
+    title = "Server Leaderboard" if board != GLOBAL else "Global Leaderboard"
+    await interaction.response.send_message(embed=embeds.leaderboard(title, rows))
 
-    if attempts[user_id] >= 3:
-        attempts.pop(user_id, None)
-        embed = discord.Embed(
-            title="Game Over",
-            description="You used all attempts.",
-            color=discord.Color.red()
-        )
-        await interaction.response.send_message(embed=embed)
+@bot.tree.command(
+    name="rank",
+    description="Show your rank, or another player's, in this server or everywhere.",
+)
+async def rank(interaction: discord.Interaction, user: discord.User = None, scope: Literal["server", "global"] = "server"):
+    user = user or interaction.user
+    board = interaction.guild_id if scope == "server" and interaction.guild_id else GLOBAL
+    found = await state.rank(board, user.id)
+    if found is None:
+        await interaction.response.send_message(embed=embeds.NO_SCORES, ephemeral=True)
         return
+    where = "in this server" if board != GLOBAL else "worldwide"
+    await interaction.response.send_message(embed=embeds.rank(user.id, where, *found))
 
-    embed = discord.Embed(
-        title="Wrong Guess",
-        description=f"Attempts left: {3 - attempts[user_id]}",
-        color=discord.Color.orange()
-    )
-    await interaction.response.send_message(embed=embed)
+def main():
+    parser = argparse.ArgumentParser(description="Run the Guess The Song bot.")
+    parser.add_argument("--force-sync", action="store_true", help="sync slash commands even if they look unchanged")
+    parser.add_argument("--shard-ids", type=parse_shards, help="shards to run in this process, e.g. 0-3 (needs SHARDED)")
+    parser.add_argument("--shard-count", type=int, help="total number of shards (needs SHARDED)")
+    args = parser.parse_args()
+
+    if (args.shard_ids or args.shard_count) and not settings.sharded:
+        parser.error('--shard-ids and --shard-count need "SHARDED": true in config.json')
+    if args.shard_ids and not args.shard_count:
+        parser.error("--shard-ids needs --shard-count")
+
+    bot.force_sync = args.force_sync
+    if settings.sharded:
+        bot.shard_ids = args.shard_ids
+        bot.shard_count = args.shard_count
+    if store is not None:
+        restore_sessions(args.shard_ids, args.shard_count)
+        restore_scores(args.shard_ids, args.shard_count)
+    try:
+        bot.run(settings.discord_token.reveal())
+    finally:
+        if store is not None:
+            store.close()
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import NamedTuple
+
+from answers import normalize
+
+# File layout: header, then for every column an offset table of count + 1
+# little-endian uint64s followed by that column's UTF-8 blob. Multi-valued
+# columns (aliases, snippets, answers) join their values with SEPARATOR.
+# "answers" holds the title and aliases already normalized, so loading a
+# catalog never has to normalize them again.
+MAGIC = b"GTSC"
+VERSION = 2
+HEADER = struct.Struct("<4sHHQ")
+COLUMNS = ("id", "title", "artist", "aliases", "snippets", "popularity", "answers")
+SEPARATOR = "\x1f"
+
+
+class Track(NamedTuple):
+    id: str
+    title: str
+    artist: str = ""
+    aliases: tuple = ()
+    snippets: tuple = ()
+    popularity: int = 0
+
+
+def normalized_answers(track: Track) -> tuple:
+    # The track's title and aliases as AnswerIndex keys, in order, without
+    # duplicates or empties.
+    return tuple(dict.fromkeys(filter(None, map(normalize, (track.title, *track.aliases)))))
+
+
+def encode(track: Track) -> list:
+    return [
+        track.id.encode(),
+        track.title.encode(),
+        track.artist.encode(),
+        SEPARATOR.join(track.aliases).encode(),
+        SEPARATOR.join(track.snippets).encode(),
+        str(track.popularity).encode(),
+        SEPARATOR.join(normalized_answers(track)).encode(),
+    ]
+
+
+class CatalogWriter:
+    # Streams tracks into one spool file per column, so writing a catalog
+    # never needs the whole track list in memory.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._spools = [open(f"{path}.{column}.tmp", "w+b") for column in COLUMNS]
+        self._offsets = [array("Q", [0]) for _ in COLUMNS]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def add(self, track: Track):
+        for spool, offsets, value in zip(self._spools, self._offsets, encode(track)):
+            spool.write(value)
+            offsets.append(offsets[-1] + len(value))
+        self.count += 1
+
+    def close(self):
+        with open(f"{self.path}.tmp", "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, len(COLUMNS), self.count))
+            for spool, offsets in zip(self._spools, self._offsets):
+                if sys.byteorder == "big":
+                    offsets.byteswap()
+                out.write(offsets.tobytes())
+                spool.seek(0)
+                while chunk := spool.read(1 << 20):
+                    out.write(chunk)
+        os.replace(f"{self.path}.tmp", self.path)
+        self._discard()
+
+    def _discard(self):
+        for spool in self._spools:
+            spool.close()
+            os.remove(spool.name)
+
+
+def write_catalog(path: str, tracks):
+    with CatalogWriter(path) as writer:
+        for track in tracks:
+            writer.add(track)
+
+
+class Catalog:
+    # Read-only, memory-mapped view of a catalog file. Opening only maps the
+    # file and reads the header; tracks are decoded on access.
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, columns, self.count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or columns != len(COLUMNS) or sys.byteorder != "little":
+            raise ValueError(f"{path} is not a version {VERSION} song catalog")
+        view = memoryview(self._map)
+        self._columns = []
+        position = HEADER.size
+        for _ in COLUMNS:
+            table_size = (self.count + 1) * 8
+            offsets = view[position:position + table_size].cast("Q")
+            blob = position + table_size
+            self._columns.append((offsets, blob))
+            position = blob + offsets[-1]
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (self[index] for index in range(self.count))
+
+    def column(self, column: int, index: int) -> str:
+        offsets, blob = self._columns[column]
+        return str(self._map[blob + offsets[index]:blob + offsets[index + 1]], "utf-8")
+
+    def __getitem__(self, index: int) -> Track:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        aliases = self.column(3, index)
+        snippets = self.column(4, index)
+        return Track(
+            self.column(0, index),
+            self.column(1, index),
+            self.column(2, index),
+            tuple(aliases.split(SEPARATOR)) if aliases else (),
+            tuple(snippets.split(SEPARATOR)) if snippets else (),
+            int(self.column(5, index)),
+        )
+
+    def title(self, index: int) -> str:
+        return self.column(1, index)
+
+    def popularity(self, index: int) -> int:
+        offsets, blob = self._columns[5]
+        return int(self._map[blob + offsets[index]:blob + offsets[index + 1]])
+
+    def answers(self, index: int) -> tuple:
+        answers = self.column(6, index)
+        return tuple(answers.split(SEPARATOR)) if answers else ()
+
+
+def answer_columns(tracks):
+    # (normalized answers, popularity) for each track in order. A Catalog
+    # reads just those two columns instead of decoding whole Tracks.
+    if isinstance(tracks, Catalog):
+        return ((tracks.answers(index), tracks.popularity(index)) for index in range(len(tracks)))
+    return ((normalized_answers(track), track.popularity) for track in tracks)
@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import json
+import os
+
+from catalog import CatalogWriter, Track
+from scheduler import BACKGROUND, RequestScheduler
+from settings import load_settings
+from spotify import SpotifyClient, SpotifyError
+
+BATCH_SIZE = 50
+
+
+def track_from_spotify(item: dict) -> Track:
+    return Track(
+        item["id"],
+        item["name"],
+        ", ".join(artist["name"] for artist in item["artists"]),
+        popularity=item.get("popularity", 0),
+    )
+
+
+class CatalogBuilder:
+    # Fetches track metadata 50 ids per request with a few requests in flight
+    # and appends every finished batch to a JSON-lines staging file. That file
+    # is the checkpoint: a rerun skips every id already in it, then streams it
+    # into the final catalog.
+
+    def __init__(self, client: SpotifyClient, staging_path: str, concurrency: int = 4):
+        self.client = client
+        self.staging_path = staging_path
+        self.concurrency = concurrency
+
+    def _checkpoint(self) -> set:
+        done = set()
+        if not os.path.exists(self.staging_path):
+            return done
+        with open(self.staging_path, "r+b") as staging:
+            valid = 0
+            for line in staging:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    done.add(json.loads(line)["id"])
+                except ValueError:
+                    break
+                valid += len(line)
+            # Drop a batch that was cut off mid-write by a crash.
+            staging.truncate(valid)
+        return done
+
+    def _staged(self):
+        with open(self.staging_path, encoding="utf-8") as staging:
+            for line in staging:
+                record = json.loads(line)
+                if record["track"] is not None:
+                    track_id, title, artist, aliases, snippets, popularity = record["track"]
+                    yield Track(track_id, title, artist, tuple(aliases), tuple(snippets), popularity)
+
+    async def _fetch(self, batch: list) -> list:
+        # Spotify rejects a whole batch with a 400 when any id in it is
+        # malformed. Halve the batch until the bad ids are on their own and
+        # stage those as missing, or every rerun would stop at the same batch.
+        try:
+            return await self.client.tracks(batch, BACKGROUND)
+        except SpotifyError as error:
+            if error.status != 400:
+                raise
+            if len(batch) == 1:
+                print(f"Skipping track id {batch[0]!r}: {error}")
+                return [None]
+        middle = len(batch) // 2
+        return await self._fetch(batch[:middle]) + await self._fetch(batch[middle:])
+
+    async def _worker(self, batches, staging):
+        for batch in batches:
+            items = await self._fetch(batch)
+            lines = []
+            for track_id, item in zip(batch, items):
+                track = track_from_spotify(item) if item is not None else None
+                lines.append(json.dumps({"id": track_id, "track": track}) + "\n")
+            staging.write("".join(lines))
+            staging.flush()
+
+    async def build(self, track_ids, catalog_path: str) -> int:
+        done = self._checkpoint()
+        pending = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in done]
+        batches = (pending[start:start + BATCH_SIZE] for start in range(0, len(pending), BATCH_SIZE))
+
+        with open(self.staging_path, "a", encoding="utf-8") as staging:
+            workers = [asyncio.create_task(self._worker(batches, staging)) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for worker in workers:
+                    worker.cancel()
+                raise
+
+        with CatalogWriter(catalog_path) as writer:
+            for track in self._staged():
+                writer.add(track)
+        return writer.count
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Build a song catalog from a file of Spotify track ids.")
+    parser.add_argument("ids", help="text file with one Spotify track id per line")
+    parser.add_argument("catalog", help="catalog file to write")
+    parser.add_argument("--staging", help="checkpoint file (default: <catalog>.staging)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    settings = load_settings("config.json", required=("SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET"))
+    with open(args.ids) as f:
+        track_ids = [line.strip() for line in f if line.strip()]
+
+    client = SpotifyClient(
+        settings.spotify_client_id,
+        settings.spotify_client_secret.reveal(),
+        scheduler=RequestScheduler(settings.spotify_rate, settings.spotify_burst),
+    )
+    await client.start()
+    try:
+        builder = CatalogBuilder(client, args.staging or f"{args.catalog}.staging", args.concurrency)
+        count = await builder.build(track_ids, args.catalog)
+    finally:
+        await client.close()
+    print(f"Wrote {count} tracks to {args.catalog}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
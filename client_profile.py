@@ -0,0 +1,51 @@
+import sys
+
+import discord
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Rough resident cost of one cached member (with its user and presence) and
+# of one cached message; the full profile keeps discord.py's default 1000.
+MEMBER_BYTES = 1024
+MESSAGE_BYTES = 2048
+MESSAGE_CACHE = 1000
+
+
+def client_options(profile: str) -> dict:
+    if profile == "full":
+        return {"intents": discord.Intents.all()}
+    if profile == "lean":
+        # Slash commands arrive as interactions, so /guess only needs the
+        # guild objects themselves: no members, presences or messages.
+        intents = discord.Intents.none()
+        intents.guilds = True
+        return {
+            "intents": intents,
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "max_messages": None,
+            "chunk_guilds_at_startup": False,
+        }
+    raise ValueError(f"Unknown client profile: {profile!r}")
+
+
+def max_rss_mib():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def cache_report(client: discord.Client, profile: str) -> str:
+    members = sum(guild.member_count or 0 for guild in client.guilds)
+    cached = sum(len(guild.members) for guild in client.guilds)
+    report = f"{profile} profile: {cached}/{members} members cached, {len(client.cached_messages)} messages cached"
+    if profile == "lean":
+        saved = ((members - cached) * MEMBER_BYTES + MESSAGE_CACHE * MESSAGE_BYTES) / (1 << 20)
+        report += f", ~{saved:.1f} MiB saved versus full"
+    rss = max_rss_mib()
+    if rss is not None:
+        report += f", peak RSS {rss:.1f} MiB"
+    return report
@@ -0,0 +1,90 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+import urllib.request
+
+from settings import load_settings
+
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    # Same formula Discord uses to route a guild's events to a shard.
+    return (guild_id >> 22) % shard_count
+
+
+def parse_shards(text: str) -> list:
+    # "0-3,8" -> [0, 1, 2, 3, 8]
+    shards = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        shards.extend(range(int(first), int(last or first) + 1))
+    return shards
+
+
+def split_shards(shards: list, workers: int) -> list:
+    size, extra = divmod(len(shards), workers)
+    ranges, start = [], 0
+    for worker in range(workers):
+        end = start + size + (worker < extra)
+        if end > start:
+            ranges.append(shards[start:end])
+        start = end
+    return ranges
+
+
+def recommended_shards(token: str) -> int:
+    request = urllib.request.Request(GATEWAY_URL, headers={"Authorization": f"Bot {token}"})
+    with urllib.request.urlopen(request) as resp:
+        return json.load(resp)["shards"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several processes, each owning a range of shards.")
+    parser.add_argument("--workers", type=int, default=2, help="number of bot processes on this machine")
+    parser.add_argument("--shard-count", type=int, help="total shards across every machine (default: Discord's recommendation)")
+    parser.add_argument("--shards", help="shards this machine runs, e.g. 0-7 (default: all)")
+    parser.add_argument("--force-sync", action="store_true", help="passed through to the worker that owns shard 0")
+    args = parser.parse_args()
+
+    settings = load_settings("config.json")
+    if not settings.sharded:
+        parser.error('set "SHARDED": true in config.json to run a cluster')
+    if settings.state_backend == "memory":
+        # Each worker would keep its own rounds and leaderboards, so the
+        # global board would only ever show one worker's guilds.
+        parser.error('a cluster needs shared state: set "STATE_BACKEND" to "sqlite" or "redis" in config.json')
+
+    shard_count = args.shard_count or recommended_shards(settings.discord_token.reveal())
+    shards = parse_shards(args.shards) if args.shards else list(range(shard_count))
+
+    def spawn(shard_ids):
+        command = [
+            sys.executable, "bot.py",
+            "--shard-count", str(shard_count),
+            "--shard-ids", ",".join(map(str, shard_ids)),
+        ]
+        if args.force_sync and 0 in shard_ids:
+            command.append("--force-sync")
+        return subprocess.Popen(command)
+
+    workers = {tuple(shard_ids): spawn(shard_ids) for shard_ids in split_shards(shards, args.workers)}
+    print(f"Started {len(workers)} workers for shards {shards[0]}-{shards[-1]} of {shard_count}")
+    try:
+        while True:
+            time.sleep(5)
+            for shard_ids, process in workers.items():
+                if process.poll() is not None:
+                    print(f"Worker for shards {list(shard_ids)} exited with {process.returncode}, restarting")
+                    workers[shard_ids] = spawn(list(shard_ids))
+    except KeyboardInterrupt:
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
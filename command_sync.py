@@ -0,0 +1,35 @@
+import hashlib
+import json
+import os
+
+from discord import app_commands
+
+
+def fingerprint(tree: app_commands.CommandTree) -> str:
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda command: command["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _load(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+async def sync_if_changed(tree: app_commands.CommandTree, path: str, force: bool = False):
+    # Returns the synced commands, or None when the stored fingerprint for
+    # this application already matches the local command definitions.
+    application_id = str(tree.client.application_id)
+    current = fingerprint(tree)
+    fingerprints = _load(path)
+    if not force and fingerprints.get(application_id) == current:
+        return None
+
+    synced = await tree.sync()
+    fingerprints[application_id] = current
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(fingerprints, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return synced
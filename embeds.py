@@ -0,0 +1,116 @@
+import functools
+
+import discord
+
+
+class FrozenEmbed(discord.Embed):
+    # An embed serialized once at construction. discord.py calls to_dict() on
+    # every send, so reusing one of these skips rebuilding the payload; it
+    # refuses changes afterwards so the cached payload can't go stale.
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._payload = super().to_dict()
+
+    def __setattr__(self, name, value):
+        if "_payload" in self.__dict__:
+            raise AttributeError("FrozenEmbed cannot be modified; copy() it into a discord.Embed instead")
+        super().__setattr__(name, value)
+
+    def to_dict(self):
+        return self._payload
+
+    def copy(self) -> discord.Embed:
+        return discord.Embed.from_dict(self._payload)
+
+
+CORRECT = FrozenEmbed(
+    title="Correct!",
+    description="You guessed the song.",
+    color=discord.Color.green()
+)
+
+GAME_OVER = FrozenEmbed(
+    title="Game Over",
+    description="You used all attempts.",
+    color=discord.Color.red()
+)
+
+SLOW_DOWN = FrozenEmbed(
+    title="Slow Down",
+    description="You're guessing too fast. Try again in a moment.",
+    color=discord.Color.dark_grey()
+)
+
+ROUND_OVER = FrozenEmbed(
+    title="Round Over",
+    description="That round just ended. Guess again to play the next song.",
+    color=discord.Color.light_grey()
+)
+
+NO_CLUES = FrozenEmbed(
+    title="No Clues",
+    description="There are no lyrics for this round yet.",
+    color=discord.Color.light_grey()
+)
+
+BUSY = FrozenEmbed(
+    title="Busy",
+    description="Too many guesses are waiting right now. Try again in a moment.",
+    color=discord.Color.dark_grey()
+)
+
+TOO_SLOW = FrozenEmbed(
+    title="Guess Not Checked",
+    description="Checking your guess took too long. Try again in a moment.",
+    color=discord.Color.dark_grey()
+)
+
+NO_SCORES = FrozenEmbed(
+    title="No Scores",
+    description="Nobody has guessed a song here yet.",
+    color=discord.Color.light_grey()
+)
+
+
+@functools.cache
+def wrong_guess(attempts_left: int) -> FrozenEmbed:
+    return FrozenEmbed(
+        title="Wrong Guess",
+        description=f"Attempts left: {attempts_left}",
+        color=discord.Color.orange()
+    )
+
+
+def clue(shown: int, total: int, text: str) -> discord.Embed:
+    return discord.Embed(
+        title=f"Clue {shown + 1}/{total}",
+        description=text,
+        color=discord.Color.blurple()
+    )
+
+
+def times_up(title: str, artist: str = "") -> discord.Embed:
+    song = f"{title} - {artist}" if artist else title
+    return discord.Embed(
+        title="Time's Up",
+        description=f"Nobody guessed it. The song was **{song}**.",
+        color=discord.Color.dark_red()
+    )
+
+
+def leaderboard(title: str, rows: list) -> discord.Embed:
+    lines = [f"{position}. <@{user_id}> - {score}" for position, (user_id, score) in enumerate(rows, 1)]
+    return discord.Embed(
+        title=title,
+        description="\n".join(lines),
+        color=discord.Color.gold()
+    )
+
+
+def rank(user_id: int, where: str, position: int, score: int, players: int) -> discord.Embed:
+    return discord.Embed(
+        title=f"Rank #{position}",
+        description=f"<@{user_id}> has {score} points: #{position} of {players} players {where}.",
+        color=discord.Color.gold()
+    )
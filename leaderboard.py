@@ -0,0 +1,154 @@
+import random
+from itertools import islice
+
+GLOBAL = 0
+MAX_LEVEL = 32
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next = [None] * level
+        # width[i] is how many positions next[i] is ahead of this node; a
+        # missing next counts as one past the last item.
+        self.width = [1] * level
+
+
+class SkipList:
+    # Indexable skip list: a sorted collection of unique keys where insert,
+    # remove, index (number of keys below a key) and lookup by position are
+    # all O(log n) expected.
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def _random_level(self) -> int:
+        # Level k with probability 2**-k: one plus the trailing zero bits.
+        bits = random.getrandbits(MAX_LEVEL - 1) | (1 << (MAX_LEVEL - 1))
+        return (bits & -bits).bit_length()
+
+    def insert(self, key):
+        update = [self._head] * MAX_LEVEL
+        passed = [0] * MAX_LEVEL
+        node, position = self._head, 0
+        for i in range(self._level - 1, -1, -1):
+            ahead = node.next[i]
+            while ahead is not None and ahead.key < key:
+                position += node.width[i]
+                node, ahead = ahead, ahead.next[i]
+            update[i], passed[i] = node, position
+
+        level = self._random_level()
+        for i in range(self._level, level):
+            self._head.width[i] = self._size + 1
+        self._level = max(self._level, level)
+
+        new = _Node(key, level)
+        for i in range(level):
+            before = update[i]
+            new.next[i] = before.next[i]
+            before.next[i] = new
+            new.width[i] = before.width[i] - (position - passed[i])
+            before.width[i] = position - passed[i] + 1
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        update = [self._head] * MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            ahead = node.next[i]
+            while ahead is not None and ahead.key < key:
+                node, ahead = ahead, ahead.next[i]
+            update[i] = node
+
+        target = node.next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for i in range(self._level):
+            before = update[i]
+            if before.next[i] is target:
+                before.width[i] += target.width[i] - 1
+                before.next[i] = target.next[i]
+            else:
+                before.width[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+
+    def index(self, key) -> int:
+        # Number of keys strictly below key, like bisect_left.
+        node, position = self._head, 0
+        for i in range(self._level - 1, -1, -1):
+            ahead = node.next[i]
+            while ahead is not None and ahead.key < key:
+                position += node.width[i]
+                node, ahead = ahead, ahead.next[i]
+        return position
+
+    def __getitem__(self, index: int):
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        node, position = self._head, 0
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and position + node.width[i] <= index + 1:
+                position += node.width[i]
+                node = node.next[i]
+        return node.key
+
+
+class Leaderboard:
+    # Scores for the global board (GLOBAL) and one board per guild. Each board
+    # keeps its players in a SkipList ordered by (-score, user_id), so a
+    # player's rank and the top of the board never need a sort.
+
+    def __init__(self):
+        self._boards = {}
+
+    def _board(self, board: int) -> tuple:
+        found = self._boards.get(board)
+        if found is None:
+            found = self._boards[board] = ({}, SkipList())
+        return found
+
+    def set(self, board: int, user_id: int, score: int):
+        scores, ranking = self._board(board)
+        old = scores.get(user_id)
+        if old is not None:
+            ranking.remove((-old, user_id))
+        scores[user_id] = score
+        ranking.insert((-score, user_id))
+
+    def add(self, board: int, user_id: int, points: int) -> int:
+        score = self._board(board)[0].get(user_id, 0) + points
+        self.set(board, user_id, score)
+        return score
+
+    def rank(self, board: int, user_id: int):
+        # Returns (rank, score, players), or None for someone with no score.
+        # Tied players share a rank.
+        scores, ranking = self._boards.get(board, ({}, None))
+        score = scores.get(user_id)
+        if score is None:
+            return None
+        return ranking.index((-score, -1)) + 1, score, len(ranking)
+
+    def top(self, board: int, limit: int = 10) -> list:
+        found = self._boards.get(board)
+        if found is None:
+            return []
+        return [(user_id, -negated) for negated, user_id in islice(found[1], limit)]
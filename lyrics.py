@@ -0,0 +1,172 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from answers import normalize
+from catalog import Track
+
+SECTION_HEADER = re.compile(r"^\[.*\]$")
+
+
+def make_clues(lyrics: str, title: str, count: int = 3, lines: int = 2) -> tuple:
+    # Evenly spaced windows of consecutive lyric lines, skipping section
+    # headers and any line that gives the title away.
+    normalized_title = normalize(title)
+    usable = [
+        line.strip() for line in lyrics.splitlines()
+        if line.strip() and not SECTION_HEADER.match(line.strip())
+        and not (normalized_title and normalized_title in normalize(line))
+    ]
+    windows = max(len(usable) - lines + 1, 0)
+    if not windows:
+        return ()
+    starts = sorted({round(i * (windows - 1) / max(count - 1, 1)) for i in range(count)})
+    return tuple(dict.fromkeys("\n".join(usable[start:start + lines]) for start in starts))
+
+
+class FixtureProvider:
+    # Lyrics from a local JSON file mapping track ids to lyrics text.
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self._lyrics = json.load(f)
+
+    async def lyrics(self, track: Track):
+        return self._lyrics.get(track.id)
+
+
+class ClueCache:
+    # Two-level LRU cache of precomputed clues: a small in-memory OrderedDict
+    # in front of an SQLite table whose total size is kept under max_bytes by
+    # evicting the least recently used rows. The tiers have separate locks so
+    # memory() never waits behind a disk query running on another thread.
+
+    def __init__(self, path: str, max_bytes: int = 64 << 20, max_entries: int = 10_000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS clues ("
+            "track_id TEXT PRIMARY KEY, clues TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS clues_used ON clues (used)")
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM clues").fetchone()[0]
+
+    def _remember(self, track_id: str, clues: tuple):
+        with self._lock:
+            self._memory[track_id] = clues
+            self._memory.move_to_end(track_id)
+            if len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def memory(self, track_id: str):
+        # The in-memory tier only, cheap enough to call on the event loop.
+        with self._lock:
+            clues = self._memory.get(track_id)
+            if clues is not None:
+                self._memory.move_to_end(track_id)
+            return clues
+
+    def get(self, track_id: str):
+        # May hit the disk; call it from a thread.
+        clues = self.memory(track_id)
+        if clues is not None:
+            return clues
+        with self._db_lock:
+            row = self._db.execute("SELECT clues FROM clues WHERE track_id = ?", (track_id,)).fetchone()
+            if row is None:
+                return None
+            with self._db:
+                self._db.execute("UPDATE clues SET used = ? WHERE track_id = ?", (time.time(), track_id))
+        clues = tuple(json.loads(row[0]))
+        self._remember(track_id, clues)
+        return clues
+
+    def __contains__(self, track_id: str):
+        if self.memory(track_id) is not None:
+            return True
+        with self._db_lock:
+            return self._db.execute("SELECT 1 FROM clues WHERE track_id = ?", (track_id,)).fetchone() is not None
+
+    def put(self, track_id: str, clues: tuple):
+        encoded = json.dumps(clues)
+        with self._db_lock, self._db:
+            old = self._db.execute("SELECT size FROM clues WHERE track_id = ?", (track_id,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO clues VALUES (?, ?, ?, ?)", (track_id, encoded, len(encoded), time.time()))
+            self._size += len(encoded) - (old[0] if old else 0)
+            while self._size > self.max_bytes:
+                evicted = self._db.execute(
+                    "DELETE FROM clues WHERE track_id = (SELECT track_id FROM clues ORDER BY used LIMIT 1) RETURNING track_id, size"
+                ).fetchone()
+                if evicted is None:
+                    break
+                self._size -= evicted[1]
+                with self._lock:
+                    self._memory.pop(evicted[0], None)
+            self._remember(track_id, clues)
+
+    def close(self):
+        self._db.close()
+
+
+class ClueService:
+    # Fills the cache ahead of time so starting a round never waits on a
+    # lyrics provider. Tracks that ship snippets in the catalog skip the fetch.
+
+    def __init__(self, cache: ClueCache, provider=None, concurrency: int = 4):
+        self.cache = cache
+        self.provider = provider
+        self.concurrency = concurrency
+        self._pending = {}
+
+    async def clues(self, track: Track) -> tuple:
+        clues = self.cache.memory(track.id)
+        if clues is None:
+            clues = await asyncio.to_thread(self.cache.get, track.id)
+        return clues or track.snippets
+
+    async def _compute(self, track: Track):
+        if track.snippets:
+            clues = track.snippets
+        elif self.provider is not None:
+            lyrics = await self.provider.lyrics(track)
+            clues = make_clues(lyrics, track.title) if lyrics else ()
+        else:
+            return
+        if clues:
+            await asyncio.to_thread(self.cache.put, track.id, clues)
+
+    async def _fill(self, track: Track):
+        if not await asyncio.to_thread(self.cache.__contains__, track.id):
+            await self._compute(track)
+
+    def prefetch(self, track: Track):
+        # Starts a background fill for one track unless it is cached or already
+        # being filled. Only the memory tier is checked here; the task looks
+        # on disk before fetching anything.
+        if track.id in self._pending or self.cache.memory(track.id) is not None:
+            return
+        task = self._pending[track.id] = asyncio.create_task(self._fill(track))
+        task.add_done_callback(lambda _: self._pending.pop(track.id, None))
+
+    async def precompute(self, tracks):
+        # Only worth it with a provider: without one there is nothing to
+        # fetch, and clues() already falls back to the catalog's snippets.
+        # Callers should pass only as many tracks as the cache can hold.
+        if self.provider is None:
+            return
+
+        async def worker():
+            for track in iterator:
+                await self._fill(track)
+
+        iterator = iter(tracks)
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
@@ -0,0 +1,120 @@
+from array import array
+from collections import Counter
+
+from answers import AnswerIndex, normalize
+
+
+def trigrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    # Optimal string alignment distance (Levenshtein plus adjacent swaps),
+    # giving up with limit + 1 as soon as it is exceeded.
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i]
+        for j in range(1, len(b) + 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class Matcher:
+    # Resolves a guess to catalog answers, tolerating typos. Exact aliases hit
+    # the AnswerIndex directly; anything else is scored only against the few
+    # aliases sharing the most trigrams with it. Checking a guess against a
+    # known answer skips all that and scores the answer's own aliases.
+
+    def __init__(self, index: AnswerIndex, similarity: float = 0.85, max_candidates: int = 16, max_postings: int = 5000, answers=None):
+        self.index = index
+        self.similarity = similarity
+        self.max_candidates = max_candidates
+        self.max_postings = max_postings
+        # Callable mapping a key to its normalized aliases, e.g.
+        # Catalog.answers. Without one, a map is built from the index.
+        self.answers = answers
+        self._by_key = None
+        # The trigram postings only serve match(), and take seconds to build
+        # for a large catalog, so they wait for its first call.
+        self._aliases = None
+        self._postings = None
+
+    def aliases(self, key) -> tuple:
+        if self.answers is not None:
+            return self.answers(key)
+        if self._by_key is None:
+            self._by_key = {}
+            for alias, keys in self.index.items():
+                for each in keys:
+                    self._by_key[each] = self._by_key.get(each, ()) + (alias,)
+        return self._by_key.get(key, ())
+
+    def _build_postings(self):
+        self._aliases, self._postings = [], {}
+        for alias_id, alias in enumerate(self.index):
+            self._aliases.append(alias)
+            for gram in trigrams(alias):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array("I")
+                postings.append(alias_id)
+
+    def limit(self, alias: str) -> int:
+        return int(len(alias) * (1 - self.similarity))
+
+    def candidates(self, normalized: str) -> list:
+        if self._postings is None:
+            self._build_postings()
+        postings = sorted(
+            (p for p in map(self._postings.get, trigrams(normalized)) if p is not None),
+            key=len,
+        )
+        # The rarest trigrams are the most selective; very common ones only add
+        # noise and cost, so skip them once we have something to go on.
+        counts = Counter()
+        for alias_ids in postings:
+            if counts and len(alias_ids) > self.max_postings:
+                break
+            counts.update(alias_ids)
+        return [self._aliases[alias_id] for alias_id, _ in counts.most_common(self.max_candidates)]
+
+    def match(self, guess: str) -> tuple:
+        normalized = normalize(guess)
+        keys = self.index.get(normalized)
+        if keys or not normalized:
+            return keys
+        best, best_distance = None, None
+        for alias in self.candidates(normalized):
+            limit = self.limit(alias)
+            distance = edit_distance(normalized, alias, limit)
+            if distance <= limit and (best is None or distance < best_distance):
+                best, best_distance = alias, distance
+        return self.index.get(best) if best is not None else ()
+
+    def matches(self, guess: str, key) -> bool:
+        # However many titles look like the guess, only the answer's own
+        # aliases decide whether it is close enough.
+        normalized = normalize(guess)
+        if not normalized:
+            return False
+        aliases = self.aliases(key)
+        if normalized in aliases:
+            return True
+        for alias in aliases:
+            limit = self.limit(alias)
+            if edit_distance(normalized, alias, limit) <= limit:
+                return True
+        return False
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from array import array
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.record_ns(time.perf_counter_ns() - self.started)
+
+
+class Histogram:
+    # HDR-style latency histogram over microseconds: values below 2 * 2**bits
+    # get exact buckets, larger ones share 2**bits linear sub-buckets per power
+    # of two. Recording is a couple of integer ops into a fixed-size array and
+    # quantiles stay within ~1 / 2**bits relative error.
+
+    def __init__(self, name: str, help: str, bits: int = 6, max_us: int = 1 << 36):
+        self.name = name
+        self.help = help
+        self.bits = bits
+        self.max_us = max_us
+        self.counts = array("Q", bytes(8 * (self._index(max_us) + 1)))
+        self.count = 0
+        self.sum_us = 0
+
+    def _index(self, value: int) -> int:
+        shift = max(value.bit_length() - self.bits - 1, 0)
+        return (shift << self.bits) + (value >> shift)
+
+    def _value(self, index: int) -> float:
+        # Midpoint of the values that land in this bucket.
+        if index < 2 << self.bits:
+            return index
+        shift = (index >> self.bits) - 1
+        mantissa = index - (shift << self.bits)
+        return ((mantissa << shift) + ((mantissa + 1) << shift) - 1) / 2
+
+    def record_ns(self, nanoseconds: int):
+        value = min(nanoseconds // 1000, self.max_us)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum_us += value
+
+    def time(self) -> Timer:
+        return Timer(self)
+
+    def quantile(self, q: float) -> float:
+        # In seconds.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self._value(index) / 1e6
+        return self.max_us / 1e6
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} summary"]
+        lines += [f'{self.name}{{quantile="{q}"}} {self.quantile(q):.6f}' for q in QUANTILES]
+        lines += [f"{self.name}_sum {self.sum_us / 1e6:.6f}", f"{self.name}_count {self.count}"]
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+
+    def inc(self, label_value: str, amount: int = 1):
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f'{self.name}{{{self.label}="{value}"}} {count}' for value, count in self.values.items()]
+        return lines
+
+
+class Gauge:
+    # Read at scrape time from a callback returning {label value: number}.
+    def __init__(self, name: str, help: str, label: str, read):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.read = read
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines += [f'{self.name}{{{self.label}="{value}"}} {number}' for value, number in self.read().items()]
+        return lines
+
+
+class Metrics:
+    def __init__(self, prefix: str = "gts"):
+        self.prefix = prefix
+        self._metrics = []
+        self._server = None
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str) -> Histogram:
+        return self._add(Histogram(f"{self.prefix}_{name}", help))
+
+    def counter(self, name: str, help: str, label: str) -> Counter:
+        return self._add(Counter(f"{self.prefix}_{name}", help, label))
+
+    def gauge(self, name: str, help: str, label: str, read) -> Gauge:
+        return self._add(Gauge(f"{self.prefix}_{name}", help, label, read))
+
+    def expose(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.expose()) + "\n"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+            if path == b"/metrics":
+                status, body = "200 OK", self.expose().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
@@ -0,0 +1,190 @@
+import asyncio
+import multiprocessing
+import struct
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from answers import AnswerIndex
+from catalog import Catalog
+from matching import Matcher
+
+# alias count, alias bytes, key count
+HEADER = struct.Struct("<QQQ")
+
+# How long a warm-up job waits for the other workers to pick up theirs.
+WARM_UP_TIMEOUT = 60.0
+
+# Each worker process builds its Matcher once per shared index.
+_matchers = {}
+# Set in each worker by the pool's initializer.
+_barrier = None
+
+
+def _init_worker(barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def share_index(index: AnswerIndex) -> SharedMemory:
+    # Copies the normalized aliases and their keys (catalog positions, so
+    # unsigned 32-bit ints) into one shared memory block:
+    #   header | aliases joined by "\n" | key count per alias | keys
+    aliases, counts, keys = [], array("I"), array("I")
+    for alias, alias_keys in index.items():
+        aliases.append(alias)
+        counts.append(len(alias_keys))
+        keys.extend(alias_keys)
+    blob = "\n".join(aliases).encode()
+    sections = (blob, counts.tobytes(), keys.tobytes())
+
+    shared = SharedMemory(create=True, size=HEADER.size + sum(map(len, sections)))
+    HEADER.pack_into(shared.buf, 0, len(counts), len(blob), len(keys))
+    position = HEADER.size
+    for section in sections:
+        shared.buf[position:position + len(section)] = section
+        position += len(section)
+    return shared
+
+
+def load_index(name: str) -> AnswerIndex:
+    shared = SharedMemory(name)
+    try:
+        count, blob_size, key_count = HEADER.unpack_from(shared.buf)
+        position = HEADER.size
+        blob = bytes(shared.buf[position:position + blob_size])
+        position += blob_size
+        counts = array("I", bytes(shared.buf[position:position + 4 * count]))
+        position += 4 * count
+        keys = array("I", bytes(shared.buf[position:position + 4 * key_count]))
+    finally:
+        shared.close()
+
+    aliases = blob.decode().split("\n") if count else []
+    items, start = [], 0
+    for alias, alias_count in zip(aliases, counts):
+        items.append((alias, tuple(keys[start:start + alias_count])))
+        start += alias_count
+    index = AnswerIndex()
+    index.update(items)
+    return index
+
+
+def match_batch(name: str, catalog_path, similarity: float, jobs: list) -> list:
+    # Runs in a worker: [(guess, key), ...] -> [matched, ...]
+    matcher = _matchers.get(name)
+    if matcher is None:
+        # The catalog is memory-mapped, so every worker reads the answers
+        # column from the same page cache instead of keeping its own map.
+        answers = Catalog(catalog_path).answers if catalog_path else None
+        matcher = _matchers[name] = Matcher(load_index(name), similarity, answers=answers)
+    return [matcher.matches(guess, key) for guess, key in jobs]
+
+
+def warm_up(name: str, catalog_path, similarity: float):
+    match_batch(name, catalog_path, similarity, [])
+    # Hold this worker until every worker has a warm-up job, so none can
+    # finish early and take a second one while another stays cold.
+    try:
+        _barrier.wait(WARM_UP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+
+
+class MatchPool:
+    # Fuzzy matching in worker processes, so scoring guesses never holds up
+    # the gateway. Workers fork before the index exists and then rebuild it
+    # from shared memory, rather than inheriting the parent's copy or having
+    # it pickled with every call. Guesses arriving in the same event loop
+    # iteration go to a worker as one batch. If a worker dies, the batches in
+    # flight fail and the next one starts a fresh pool.
+
+    def __init__(self, workers: int, similarity: float = 0.85, batch_size: int = 64):
+        self.workers = workers
+        self.similarity = similarity
+        self.batch_size = batch_size
+        # fork, not spawn: spawned workers would re-import bot.py and load
+        # the whole catalog themselves.
+        # Workers must share this process's resource tracker; one of their
+        # own would unlink the shared index when the worker exits.
+        resource_tracker.ensure_running()
+        self._context = multiprocessing.get_context("fork")
+        self._barrier = self._context.Barrier(workers)
+        self._executor = self._start_executor()
+        self._shared = None
+        self._catalog_path = None
+        self._batch = []
+        self._flush_pending = False
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            self.workers, mp_context=self._context, initializer=_init_worker, initargs=(self._barrier,)
+        )
+        # Forking happens on the first submit, so do it now while this
+        # process is still small.
+        for _ in range(self.workers):
+            executor.submit(int)
+        return executor
+
+    def _submit(self, *args):
+        try:
+            return self._executor.submit(*args)
+        except BrokenProcessPool:
+            # A restarted pool forks from the full parent; its workers build
+            # their Matchers on their first batch instead of warming up.
+            print("A match worker died, restarting the pool")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._start_executor()
+            return self._executor.submit(*args)
+
+    def load(self, index: AnswerIndex, catalog_path=None):
+        self._shared = share_index(index)
+        self._catalog_path = catalog_path
+        # Build the Matcher in every worker up front instead of on the first
+        # guesses. The warm-up jobs meet at a barrier, so each worker runs
+        # exactly one of them.
+        self._barrier.reset()
+        for _ in range(self.workers):
+            self._submit(warm_up, self._shared.name, catalog_path, self.similarity)
+
+    async def matches(self, guess: str, key) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((guess, key, future))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        elif not self._flush_pending:
+            self._flush_pending = True
+            loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self):
+        batch, self._batch = self._batch, []
+        self._flush_pending = False
+        if not batch:
+            return
+        jobs = [(guess, key) for guess, key, _ in batch]
+        done = asyncio.wrap_future(self._submit(match_batch, self._shared.name, self._catalog_path, self.similarity, jobs))
+
+        def resolve(done):
+            error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+            results = done.result() if error is None else [None] * len(batch)
+            for (_, _, future), matched in zip(batch, results):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(matched)
+                else:
+                    future.set_exception(error)
+
+        done.add_done_callback(resolve)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._shared is not None:
+            self._shared.close()
+            self._shared.unlink()
+            self._shared = None
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, channel_id)
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, channel_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS scores_by_rank ON scores (guild_id, score);
+CREATE TABLE IF NOT EXISTS boards (
+    guild_id INTEGER PRIMARY KEY,
+    players INTEGER NOT NULL
+);
+-- Keeps each board's player count without counting its scores rows. An
+-- upsert that only raises an existing score fires no INSERT trigger.
+CREATE TRIGGER IF NOT EXISTS count_players AFTER INSERT ON scores BEGIN
+    INSERT INTO boards VALUES (NEW.guild_id, 1)
+    ON CONFLICT (guild_id) DO UPDATE SET players = players + 1;
+END;
+-- Databases with scores from before the boards table existed.
+INSERT INTO boards SELECT guild_id, COUNT(*) FROM scores
+WHERE NOT EXISTS (SELECT 1 FROM boards) GROUP BY guild_id;
+"""
+
+
+class GameStore:
+    # Write-behind SQLite persistence for sessions, attempts and scores. The
+    # save_* methods only record the latest value in memory; a background
+    # task coalesces them and writes each batch in one transaction off the
+    # loop. Scores are written as increments, so processes sharing the file
+    # never overwrite each other's points.
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._attempts = {}
+        self._cleared = set()
+        self._scores = {}
+        self._task = None
+
+    def load(self, attempts_ttl: float) -> list:
+        # Returns [(key, answer, started_at, [(user_id, count), ...]), ...]
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM attempts WHERE updated_at < ?", (time.time() - attempts_ttl,))
+            rounds = {
+                (guild_id, channel_id): (json.loads(answer), started_at, [])
+                for guild_id, channel_id, answer, started_at
+                in self._db.execute("SELECT guild_id, channel_id, answer, started_at FROM sessions")
+            }
+            for guild_id, channel_id, user_id, count in self._db.execute(
+                "SELECT guild_id, channel_id, user_id, count FROM attempts"
+            ):
+                if (guild_id, channel_id) in rounds:
+                    rounds[guild_id, channel_id][2].append((user_id, count))
+        return [(key, answer, started_at, users) for key, (answer, started_at, users) in rounds.items()]
+
+    def load_scores(self) -> list:
+        # Returns [(board, user_id, score), ...]
+        with self._lock:
+            return self._db.execute("SELECT guild_id, user_id, score FROM scores").fetchall()
+
+    def save_session(self, session):
+        self._sessions[session.key] = (json.dumps(session.answer), session.started_at)
+
+    def end_session(self, key: tuple):
+        self._sessions[key] = None
+        self._cleared.add(key)
+        for pending in [pending for pending in self._attempts if pending[:2] == key]:
+            del self._attempts[pending]
+
+    def save_attempts(self, key: tuple, user_id: int, count: int):
+        self._attempts[(*key, user_id)] = (count, time.time())
+
+    def add_score(self, board: int, user_id: int, points: int):
+        self._scores[board, user_id] = self._scores.get((board, user_id), 0) + points
+
+    def _take(self):
+        batch = self._sessions, self._attempts, self._cleared, self._scores
+        self._sessions, self._attempts, self._cleared, self._scores = {}, {}, set(), {}
+        return batch
+
+    def _write(self, sessions: dict, attempts: dict, cleared: set, scores: dict):
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM attempts WHERE guild_id = ? AND channel_id = ?", cleared)
+            self._db.executemany(
+                "DELETE FROM sessions WHERE guild_id = ? AND channel_id = ?",
+                [key for key, value in sessions.items() if value is None],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                [(*key, *value) for key, value in sessions.items() if value is not None],
+            )
+            self._db.executemany(
+                "DELETE FROM attempts WHERE guild_id = ? AND channel_id = ? AND user_id = ?",
+                [key for key, (count, _) in attempts.items() if count == 0],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO attempts VALUES (?, ?, ?, ?, ?)",
+                [(*key, count, updated_at) for key, (count, updated_at) in attempts.items() if count != 0],
+            )
+            self._db.executemany(
+                "INSERT INTO scores VALUES (?, ?, ?) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET score = score + excluded.score",
+                [(*key, points) for key, points in scores.items()],
+            )
+
+    async def flush(self):
+        if self._sessions or self._attempts or self._cleared or self._scores:
+            await asyncio.to_thread(self._write, *self._take())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        # Called once the event loop has stopped, so writing inline is fine.
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._write(*self._take())
+        self._db.close()
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+
+
+class Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class TokenBuckets:
+    # Lazily refilled token buckets keyed by id. Buckets are ordered by last
+    # use, and one that has had time to refill completely is no different
+    # from a missing one, so those are dropped from the front as we go.
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._full_after = capacity / rate
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _refill(self, key, now: float):
+        buckets = self._buckets
+        while buckets:
+            oldest, bucket = next(iter(buckets.items()))
+            if now - bucket.updated < self._full_after:
+                break
+            del buckets[oldest]
+
+        bucket = buckets.get(key)
+        if bucket is None:
+            return None, self.capacity
+        return bucket, min(self.capacity, bucket.tokens + (now - bucket.updated) * self.rate)
+
+    def check(self, key) -> bool:
+        # Whether key has a token to spend, without spending it.
+        return self._refill(key, self.clock())[1] >= 1
+
+    def charge(self, key):
+        now = self.clock()
+        bucket, tokens = self._refill(key, now)
+        if bucket is None:
+            self._buckets[key] = Bucket(tokens - 1, now)
+        else:
+            bucket.tokens = tokens - 1
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+
+    def allow(self, key) -> bool:
+        if not self.check(key):
+            return False
+        self.charge(key)
+        return True
+
+
+class RateLimiter:
+    def __init__(self, user_rate: float, user_burst: float, guild_rate: float, guild_burst: float):
+        self.users = TokenBuckets(user_rate, user_burst)
+        self.guilds = TokenBuckets(guild_rate, guild_burst)
+
+    def allow(self, user_id: int, guild_id) -> bool:
+        # Both buckets must have a token before either is charged, so a guess
+        # turned away by the guild limit doesn't cost the user one too.
+        if not self.users.check(user_id):
+            return False
+        if guild_id is not None:
+            if not self.guilds.check(guild_id):
+                return False
+            self.guilds.charge(guild_id)
+        self.users.charge(user_id)
+        return True
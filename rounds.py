@@ -0,0 +1,79 @@
+import asyncio
+import heapq
+import time
+
+
+class RoundTimer:
+    # Deadlines for every timed round in one min-heap, served by a single task
+    # that sleeps until the earliest one. Scheduling and expiring are
+    # O(log n); rescheduling or cancelling just updates _deadlines and leaves
+    # the old heap entry behind to be skipped when it surfaces.
+
+    def __init__(self, on_expire, clock=time.time):
+        self.on_expire = on_expire
+        self.clock = clock
+        self._heap = []
+        self._deadlines = {}
+        self._payloads = {}
+        self._wake = asyncio.Event()
+        self._task = None
+        self._expiring = set()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key: tuple):
+        return key in self._deadlines
+
+    def schedule(self, key: tuple, deadline: float, payload=None):
+        self._payloads[key] = payload
+        if self._deadlines.get(key) == deadline:
+            return
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        if self._heap[0][1] == key:
+            self._wake.set()
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def cancel(self, key: tuple):
+        self._deadlines.pop(key, None)
+        self._payloads.pop(key, None)
+
+    def _pop_expired(self, now: float) -> list:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                expired.append((key, self._payloads.pop(key)))
+        return expired
+
+    async def _run(self):
+        while True:
+            for key, payload in self._pop_expired(self.clock()):
+                # Expiry handlers talk to the state backend and Discord, so
+                # they run on their own instead of holding up the next deadline.
+                task = asyncio.create_task(self.on_expire(key, payload))
+                self._expiring.add(task)
+                task.add_done_callback(self._expiring.discard)
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            self._wake.clear()
+            timeout = self._heap[0][0] - self.clock() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._expiring):
+            task.cancel()
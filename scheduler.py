@@ -0,0 +1,84 @@
+import asyncio
+import time
+from collections import deque
+
+INTERACTIVE = 0
+BACKGROUND = 1
+LANES = ("interactive", "background")
+
+
+class RequestScheduler:
+    # Token-bucket gate for outgoing API calls. Callers queue in one lane per
+    # priority; a single dispatcher task hands out tokens, always draining the
+    # interactive lane first and pausing everything while a Retry-After runs.
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lanes = tuple(deque() for _ in LANES)
+        self._dispatcher = None
+        self.granted = [0] * len(LANES)
+        self.wait_total = [0.0] * len(LANES)
+        self.wait_max = [0.0] * len(LANES)
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _grant(self, priority: int, waited: float):
+        self._tokens -= 1
+        self.granted[priority] += 1
+        self.wait_total[priority] += waited
+        self.wait_max[priority] = max(self.wait_max[priority], waited)
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        now = self.clock()
+        self._refill(now)
+        if self._tokens >= 1 and now >= self._blocked_until and not any(self._lanes):
+            self._grant(priority, 0.0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].append((now, future))
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        try:
+            while any(self._lanes):
+                now = self.clock()
+                self._refill(now)
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    continue
+                priority = next(priority for priority, lane in enumerate(self._lanes) if lane)
+                queued_at, future = self._lanes[priority].popleft()
+                if not future.done():
+                    self._grant(priority, now - queued_at)
+                    future.set_result(None)
+        finally:
+            self._dispatcher = None
+
+    def backoff(self, retry_after: float):
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, self.clock() + retry_after)
+
+    def stats(self) -> dict:
+        stats = {"throttled": self.throttled, "tokens": self._tokens}
+        for priority, lane in enumerate(LANES):
+            granted = self.granted[priority]
+            stats[lane] = {
+                "queued": len(self._lanes[priority]),
+                "granted": granted,
+                "wait_avg": self.wait_total[priority] / granted if granted else 0.0,
+                "wait_max": self.wait_max[priority],
+            }
+        return stats
@@ -0,0 +1,94 @@
+import random
+from array import array
+
+# Weighted picks that land in the no-repeat window are redrawn up to this many
+# times. If a few hits hold most of the weight and they were all played
+# recently, the pick falls back to uniform draws. The window is capped at half
+# the catalog, so those succeed at least half the time.
+MAX_TRIES = 32
+
+
+class AliasTable:
+    # Vose's alias method: after an O(n) build, each weighted sample is one
+    # random column plus one coin flip, whatever the size of the catalog.
+
+    def __init__(self, weights):
+        weights = array("d", weights)
+        count = len(weights)
+        if not count:
+            raise ValueError("AliasTable needs at least one weight")
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("AliasTable weights must add up to more than zero")
+        self.probability = array("d", bytes(8 * count))
+        self.alias = array("I", bytes(4 * count))
+
+        scaled = array("d", (weight * count / total for weight in weights))
+        small = [index for index, weight in enumerate(scaled) if weight < 1]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+        # Whatever is left is 1 up to rounding error.
+        for index in small + large:
+            self.probability[index] = 1.0
+
+    def __len__(self):
+        return len(self.probability)
+
+    def sample(self, rng=random) -> int:
+        column = int(rng.random() * len(self.probability))
+        return column if rng.random() < self.probability[column] else self.alias[column]
+
+
+class History:
+    # The last `size` answers in one ring buffer, plus a set of the same
+    # answers for O(1) membership checks.
+    __slots__ = ("recent", "played", "position")
+
+    def __init__(self, size: int):
+        self.recent = array("i", [-1]) * size
+        self.played = set()
+        self.position = 0
+
+    def __contains__(self, answer: int):
+        return answer in self.played
+
+    def add(self, answer: int):
+        oldest = self.recent[self.position]
+        if oldest >= 0:
+            self.played.discard(oldest)
+        self.recent[self.position] = answer
+        self.played.add(answer)
+        self.position = (self.position + 1) % len(self.recent)
+
+
+class Selector:
+    # Picks each round's answer by popularity and keeps every session from
+    # hearing any of its last `window` songs again.
+
+    def __init__(self, weights, window: int = 50, rng=random):
+        self.table = AliasTable(weights)
+        self.window = max(0, min(window, len(self.table) // 2))
+        self.rng = rng
+        self._histories = {}
+
+    def pick(self, key: tuple) -> int:
+        answer = self.table.sample(self.rng)
+        if not self.window:
+            return answer
+        history = self._histories.get(key)
+        if history is None:
+            history = self._histories[key] = History(self.window)
+        tries = 1
+        while answer in history:
+            if tries < MAX_TRIES:
+                answer = self.table.sample(self.rng)
+            else:
+                answer = int(self.rng.random() * len(self.table))
+            tries += 1
+        history.add(answer)
+        return answer
@@ -0,0 +1,58 @@
+import time
+
+from attempts import AttemptStore
+
+
+class Session:
+    __slots__ = ("key", "answer", "attempts", "started_at")
+
+    def __init__(self, key: tuple, answer, attempts: AttemptStore, started_at: float):
+        self.key = key
+        self.answer = answer
+        self.attempts = attempts
+        self.started_at = started_at
+
+
+class SessionManager:
+    # One independent round per guild (or per channel), looked up by a
+    # (guild_id, channel_id) tuple key in a plain dict.
+
+    def __init__(self, new_answer, new_attempts=AttemptStore, scope: str = "guild"):
+        if scope not in ("guild", "channel"):
+            raise ValueError(f"Unknown session scope: {scope!r}")
+        self.new_answer = new_answer
+        self.new_attempts = new_attempts
+        self.scope = scope
+        self._sessions = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(self._sessions.values())
+
+    def key_for(self, guild_id, channel_id) -> tuple:
+        # DMs have no guild, so they always get a round of their own.
+        if guild_id is None or self.scope == "channel":
+            return (guild_id or 0, channel_id)
+        return (guild_id, 0)
+
+    def get(self, key: tuple):
+        return self._sessions.get(key)
+
+    def start(self, key: tuple, answer=None, started_at: float = None) -> Session:
+        session = Session(
+            key,
+            self.new_answer(key) if answer is None else answer,
+            self.new_attempts(),
+            time.time() if started_at is None else started_at,
+        )
+        self._sessions[key] = session
+        return session
+
+    def get_or_start(self, key: tuple) -> Session:
+        session = self._sessions.get(key)
+        return session if session is not None else self.start(key)
+
+    def end(self, key: tuple):
+        return self._sessions.pop(key, None)
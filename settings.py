@@ -0,0 +1,208 @@
+import dataclasses
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+class ConfigError(Exception):
+    pass
+
+
+class Secret:
+    # A credential that stays out of reprs and logs. It can also name a file
+    # (e.g. a mounted Docker secret) that is only read when first revealed.
+
+    def __init__(self, value: str = "", path: str = ""):
+        self._value = value
+        self._path = path
+
+    def __repr__(self):
+        return "Secret('****')" if self else "Secret('')"
+
+    def __bool__(self):
+        return bool(self._value or self._path)
+
+    def __eq__(self, other):
+        return isinstance(other, Secret) and (self._value, self._path) == (other._value, other._path)
+
+    def __hash__(self):
+        return hash((self._value, self._path))
+
+    def reveal(self) -> str:
+        if not self._value and self._path:
+            with open(self._path) as f:
+                self._value = f.read().strip()
+        return self._value
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    discord_token: Secret = Secret()
+    discord_bot_id: str = ""
+    spotify_client_id: str = ""
+    spotify_client_secret: Secret = Secret()
+    spotify_rate: float = 10.0
+    spotify_burst: int = 20
+    catalog_path: str = ""
+    lyrics_cache_path: str = ""
+    lyrics_cache_bytes: int = 64 << 20
+    lyrics_memory_entries: int = 10_000
+    lyrics_fixtures: str = ""
+    lyrics_precompute: int = 1000
+    clue_interval: float = 30
+    round_duration: float = 180
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
+    client_profile: str = "full"
+    sharded: bool = False
+    sync_fingerprint_path: str = ".command_sync.json"
+    match_similarity: float = 0.85
+    match_workers: int = 0
+    match_batch_size: int = 64
+    selection_window: int = 50
+    user_guess_rate: float = 0.5
+    user_guess_burst: int = 3
+    guild_guess_rate: float = 10
+    guild_guess_burst: int = 30
+    rate_limit_action: str = "reply"
+    guess_response: str = "immediate"
+    guess_workers: int = 32
+    guess_queue_size: int = 1000
+    guess_timeout: float = 10.0
+    attempts_max_users: int = 100_000
+    attempts_ttl: float = 3600
+    session_scope: str = "guild"
+    state_backend: str = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    database_path: str = ""
+    database_flush_interval: float = 1.0
+
+
+CHOICES = {
+    "client_profile": ("full", "lean"),
+    "rate_limit_action": ("reply", "drop"),
+    "guess_response": ("immediate", "deferred"),
+    "session_scope": ("guild", "channel"),
+    "state_backend": ("memory", "sqlite", "redis"),
+}
+# Numbers outside these ranges would divide by zero, hang a queue or make a
+# setting meaningless, so they are reported like type errors.
+POSITIVE = (
+    "spotify_rate", "user_guess_rate", "guild_guess_rate", "clue_interval",
+    "attempts_ttl", "database_flush_interval", "guess_timeout",
+)
+# A burst below 1 is a bucket that can never hold a whole token.
+AT_LEAST_ONE = (
+    "spotify_burst", "user_guess_burst", "guild_guess_burst", "attempts_max_users",
+    "guess_workers", "guess_queue_size", "match_batch_size",
+)
+NON_NEGATIVE = (
+    "lyrics_cache_bytes", "lyrics_memory_entries", "lyrics_precompute", "round_duration", "metrics_port",
+    "selection_window", "match_workers",
+)
+RANGES = {
+    **{name: (lambda value: value > 0, "greater than 0") for name in POSITIVE},
+    **{name: (lambda value: value >= 1, "at least 1") for name in AT_LEAST_ONE},
+    **{name: (lambda value: value >= 0, "0 or more") for name in NON_NEGATIVE},
+    "match_similarity": (lambda value: 0 < value <= 1, "greater than 0 and at most 1"),
+}
+TRUE = ("1", "true", "yes", "on")
+FALSE = ("0", "false", "no", "off", "")
+
+
+def _from_env(kind, text: str):
+    if kind is bool:
+        if text.lower() not in TRUE + FALSE:
+            raise ValueError(f"expected a boolean, got {text!r}")
+        return text.lower() in TRUE
+    return kind(text)
+
+
+def _check(kind, value):
+    if kind is Secret:
+        return Secret(value) if isinstance(value, str) else None
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value if type(value) is kind else None
+
+
+def load_settings(path: str = "config.json", required=("DISCORD_TOKEN",), environ=os.environ) -> Settings:
+    # Reads the JSON config, lets any key be overridden by an environment
+    # variable of the same name (secrets also by <KEY>_FILE), and reports
+    # every problem at once instead of failing on the first lookup.
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        raw = {}
+    except ValueError as error:
+        raise ConfigError(f"{path} is not valid JSON: {error}") from None
+
+    fields = {field.name.upper(): field for field in dataclasses.fields(Settings)}
+    problems = [f"unknown key {key}" for key in raw if key not in fields]
+    values = {}
+    for key, field in fields.items():
+        kind = field.type
+        if kind is Secret and environ.get(f"{key}_FILE"):
+            values[field.name] = Secret(path=environ[f"{key}_FILE"])
+            continue
+        if key in environ:
+            try:
+                value = Secret(environ[key]) if kind is Secret else _from_env(kind, environ[key])
+            except ValueError as error:
+                problems.append(f"{key} from the environment: {error}")
+                continue
+        elif key in raw:
+            value = _check(kind, raw[key])
+            if value is None:
+                problems.append(f"{key} must be {'a string' if kind is Secret else kind.__name__}, got {raw[key]!r}")
+                continue
+        else:
+            continue
+        if field.name in CHOICES and value not in CHOICES[field.name]:
+            problems.append(f"{key} must be one of {', '.join(CHOICES[field.name])}, got {value!r}")
+            continue
+        if field.name in RANGES and not RANGES[field.name][0](value):
+            problems.append(f"{key} must be {RANGES[field.name][1]}, got {value!r}")
+            continue
+        values[field.name] = value
+
+    for key in required:
+        if not values.get(key.lower()):
+            problems.append(f"{key} is required (set it in {path} or the environment)")
+    if values.get("state_backend") == "sqlite" and not values.get("database_path"):
+        problems.append("STATE_BACKEND sqlite needs DATABASE_PATH")
+    if values.get("spotify_client_id") and not values.get("spotify_client_secret"):
+        problems.append("SPOTIFY_CLIENT_ID is set but SPOTIFY_CLIENT_SECRET is not")
+    if problems:
+        raise ConfigError(f"Invalid configuration in {path}:\n  " + "\n  ".join(problems))
+    return Settings(**values)
+
+
+class StartupTimer:
+    # Wall-clock time of each cold-start phase, for finding slow restarts.
+
+    def __init__(self):
+        self.phases = {}
+        self._started = {}
+
+    def start(self, name: str, at: float = None):
+        self._started[name] = time.perf_counter() if at is None else at
+
+    def stop(self, name: str):
+        started = self._started.pop(name, None)
+        if started is not None:
+            self.phases[name] = time.perf_counter() - started
+
+    @contextmanager
+    def phase(self, name: str):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def report(self) -> str:
+        total = sum(self.phases.values())
+        return "Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items()) + f" (total {total:.2f}s)"
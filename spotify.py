@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import aiohttp
+
+from scheduler import INTERACTIVE, RequestScheduler
+
+API_URL = "https://api.spotify.com/v1"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+
+class SpotifyError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Spotify returned {status}: {message}")
+        self.status = status
+
+
+class SpotifyClient:
+    # Client-credentials Spotify client sharing one keep-alive connection
+    # pool. The token is refreshed in the background before it expires and
+    # identical GETs already in flight are awaited instead of re-sent. Every
+    # API call goes through the scheduler, which also absorbs 429 backoff.
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        api_url: str = API_URL,
+        token_url: str = TOKEN_URL,
+        pool_size: int = 20,
+        token_margin: float = 60,
+        scheduler: RequestScheduler = None,
+        max_retries: int = 3,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url.rstrip("/")
+        self.token_url = token_url
+        self.pool_size = pool_size
+        self.token_margin = token_margin
+        self.scheduler = scheduler or RequestScheduler()
+        self.max_retries = max_retries
+        self._session = None
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+        self._refresher = None
+        self._inflight = {}
+
+    async def start(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=300, ttl_dns_cache=300),
+            raise_for_status=False,
+        )
+        await self.token()
+        self._refresher = asyncio.create_task(self._refresh())
+
+    async def close(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _fetch_token(self):
+        auth = aiohttp.BasicAuth(self.client_id, self.client_secret)
+        async with self._session.post(self.token_url, data={"grant_type": "client_credentials"}, auth=auth) as resp:
+            if resp.status != 200:
+                raise SpotifyError(resp.status, await resp.text())
+            data = await resp.json(content_type=None)
+        self._token = data["access_token"]
+        self._token_expires = time.monotonic() + data["expires_in"] - self.token_margin
+
+    async def token(self) -> str:
+        if self._token is None or time.monotonic() >= self._token_expires:
+            async with self._token_lock:
+                if self._token is None or time.monotonic() >= self._token_expires:
+                    await self._fetch_token()
+        return self._token
+
+    async def _refresh(self):
+        while True:
+            await asyncio.sleep(max(self._token_expires - time.monotonic(), 1))
+            try:
+                async with self._token_lock:
+                    await self._fetch_token()
+            except (aiohttp.ClientError, SpotifyError):
+                # token() fetches on demand if the background refresh keeps failing.
+                await asyncio.sleep(5)
+
+    async def _get(self, path: str, params: dict, priority: int):
+        reauthorized = False
+        for _ in range(self.max_retries + 1):
+            await self.scheduler.acquire(priority)
+            headers = {"Authorization": f"Bearer {await self.token()}"}
+            async with self._session.get(self.api_url + path, params=params, headers=headers) as resp:
+                if resp.status == 429:
+                    self.scheduler.backoff(float(resp.headers.get("Retry-After", 1)))
+                    continue
+                if resp.status == 401 and not reauthorized:
+                    reauthorized = True
+                    self._token = None
+                    continue
+                if resp.status != 200:
+                    raise SpotifyError(resp.status, await resp.text())
+                return await resp.json(content_type=None)
+        raise SpotifyError(429, f"still rate limited after {self.max_retries} retries")
+
+    async def get(self, path: str, priority: int = INTERACTIVE, **params):
+        key = (path, tuple(sorted(params.items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._get(path, params, priority))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def track(self, track_id: str, priority: int = INTERACTIVE) -> dict:
+        return await self.get(f"/tracks/{track_id}", priority)
+
+    async def tracks(self, track_ids: list, priority: int = INTERACTIVE) -> list:
+        # Up to 50 ids per call; unknown ids come back as None.
+        data = await self.get("/tracks", priority, ids=",".join(track_ids))
+        return data["tracks"]
+
+    async def search_tracks(self, query: str, limit: int = 10, priority: int = INTERACTIVE) -> list:
+        data = await self.get("/search", priority, q=query, type="track", limit=limit)
+        return data["tracks"]["items"]
@@ -0,0 +1,424 @@
+import asyncio
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from leaderboard import GLOBAL, Leaderboard
+from persistence import SCHEMA, GameStore
+from sessions import SessionManager
+
+
+class StateBackend(ABC):
+    # Source of truth for rounds and attempt counters. Every method is a
+    # single atomic step, so several bot processes can share one backend.
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def get_round(self, key: tuple):
+        # Returns (answer, started_at), or None when no round is running.
+        ...
+
+    @abstractmethod
+    async def claim_round(self, key: tuple, answer, started_at: float) -> tuple:
+        # Starts a round unless one is running; returns the round that won.
+        ...
+
+    @abstractmethod
+    async def end_round(self, key: tuple, answer) -> bool:
+        # Ends the round only if it still has this answer.
+        ...
+
+    @abstractmethod
+    async def record_miss(self, key: tuple, user_id: int, limit: int) -> int:
+        # Counts a wrong guess and returns the new count; reaching the limit
+        # clears the counter in the same step. Returns 0 without counting
+        # when no round is running, e.g. a correct guess just ended it.
+        ...
+
+    @abstractmethod
+    async def award(self, guild_id: int, user_id: int, points: int):
+        # Adds points on the global board and, outside DMs, the guild's own.
+        ...
+
+    @abstractmethod
+    async def top(self, board: int, limit: int) -> list:
+        # Returns [(user_id, score), ...] best first; board is a guild id or
+        # GLOBAL.
+        ...
+
+    @abstractmethod
+    async def rank(self, board: int, user_id: int):
+        # Returns (rank, score, players), or None for a player with no score.
+        # Tied players share a rank.
+        ...
+
+
+class MemoryBackend(StateBackend):
+    # Single-process state kept in the SessionManager, optionally mirrored to
+    # SQLite by a write-behind GameStore.
+
+    def __init__(self, sessions: SessionManager, store: GameStore = None):
+        self.sessions = sessions
+        self.store = store
+        self.leaderboard = Leaderboard()
+
+    async def get_round(self, key: tuple):
+        session = self.sessions.get(key)
+        return (session.answer, session.started_at) if session is not None else None
+
+    async def claim_round(self, key: tuple, answer, started_at: float) -> tuple:
+        session = self.sessions.get(key)
+        if session is None:
+            session = self.sessions.start(key, answer, started_at)
+            if self.store is not None:
+                self.store.save_session(session)
+        return session.answer, session.started_at
+
+    async def end_round(self, key: tuple, answer) -> bool:
+        session = self.sessions.get(key)
+        if session is None or session.answer != answer:
+            return False
+        self.sessions.end(key)
+        if self.store is not None:
+            self.store.end_session(key)
+        return True
+
+    async def record_miss(self, key: tuple, user_id: int, limit: int) -> int:
+        session = self.sessions.get(key)
+        if session is None:
+            return 0
+        count = session.attempts.increment(user_id)
+        if count >= limit:
+            session.attempts.pop(user_id)
+        if self.store is not None:
+            self.store.save_attempts(key, user_id, count if count < limit else 0)
+        return count
+
+    async def award(self, guild_id: int, user_id: int, points: int):
+        for board in {GLOBAL, guild_id or GLOBAL}:
+            self.leaderboard.add(board, user_id, points)
+            if self.store is not None:
+                self.store.add_score(board, user_id, points)
+
+    async def top(self, board: int, limit: int) -> list:
+        return self.leaderboard.top(board, limit)
+
+    async def rank(self, board: int, user_id: int):
+        return self.leaderboard.rank(board, user_id)
+
+
+class SQLiteBackend(StateBackend):
+    # Shared state in an SQLite database (same schema as GameStore), for
+    # processes on one machine. Statements run on a single worker thread so
+    # the event loop never blocks on the database.
+
+    def __init__(self, path: str, attempts_ttl: float = 3600):
+        self.path = path
+        self.attempts_ttl = attempts_ttl
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-state")
+        self._db = None
+
+    def _open(self):
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def start(self):
+        await self._run(self._open)
+
+    async def close(self):
+        await self._run(self._db.close)
+        self._executor.shutdown()
+
+    def _transaction(self, function, *args):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            result = function(*args)
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+        return result
+
+    def _get_round(self, key: tuple):
+        row = self._db.execute(
+            "SELECT answer, started_at FROM sessions WHERE guild_id = ? AND channel_id = ?", key
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row is not None else None
+
+    async def get_round(self, key: tuple):
+        return await self._run(self._get_round, key)
+
+    def _claim_round(self, key: tuple, answer, started_at: float) -> tuple:
+        self._db.execute("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?)", (*key, json.dumps(answer), started_at))
+        return self._get_round(key)
+
+    async def claim_round(self, key: tuple, answer, started_at: float) -> tuple:
+        return await self._run(self._transaction, self._claim_round, key, answer, started_at)
+
+    def _end_round(self, key: tuple, answer) -> bool:
+        ended = self._db.execute(
+            "DELETE FROM sessions WHERE guild_id = ? AND channel_id = ? AND answer = ?", (*key, json.dumps(answer))
+        ).rowcount
+        if ended:
+            self._db.execute("DELETE FROM attempts WHERE guild_id = ? AND channel_id = ?", key)
+        return bool(ended)
+
+    async def end_round(self, key: tuple, answer) -> bool:
+        return await self._run(self._transaction, self._end_round, key, answer)
+
+    def _record_miss(self, key: tuple, user_id: int, limit: int) -> int:
+        if self._get_round(key) is None:
+            return 0
+        now = time.time()
+        (count,) = self._db.execute(
+            "INSERT INTO attempts VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT (guild_id, channel_id, user_id) DO UPDATE SET "
+            "count = CASE WHEN updated_at < ? THEN 1 ELSE count + 1 END, updated_at = excluded.updated_at "
+            "RETURNING count",
+            (*key, user_id, now, now - self.attempts_ttl),
+        ).fetchone()
+        if count >= limit:
+            self._db.execute(
+                "DELETE FROM attempts WHERE guild_id = ? AND channel_id = ? AND user_id = ?", (*key, user_id)
+            )
+        return count
+
+    async def record_miss(self, key: tuple, user_id: int, limit: int) -> int:
+        return await self._run(self._transaction, self._record_miss, key, user_id, limit)
+
+    def _award(self, guild_id: int, user_id: int, points: int):
+        self._db.executemany(
+            "INSERT INTO scores VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id, user_id) DO UPDATE SET score = score + excluded.score",
+            [(board, user_id, points) for board in {GLOBAL, guild_id or GLOBAL}],
+        )
+
+    async def award(self, guild_id: int, user_id: int, points: int):
+        await self._run(self._transaction, self._award, guild_id, user_id, points)
+
+    def _top(self, board: int, limit: int) -> list:
+        return self._db.execute(
+            "SELECT user_id, score FROM scores WHERE guild_id = ? ORDER BY score DESC, user_id LIMIT ?", (board, limit)
+        ).fetchall()
+
+    async def top(self, board: int, limit: int) -> list:
+        return await self._run(self._top, board, limit)
+
+    def _rank(self, board: int, user_id: int):
+        # The player count is kept in boards, but counting the players ahead
+        # walks the scores_by_rank index past each of them: O(log n + rank),
+        # not O(log n). The redis backend's ZCOUNT doesn't have this cost.
+        row = self._db.execute("SELECT score FROM scores WHERE guild_id = ? AND user_id = ?", (board, user_id)).fetchone()
+        if row is None:
+            return None
+        (ahead,) = self._db.execute("SELECT COUNT(*) FROM scores WHERE guild_id = ? AND score > ?", (board, row[0])).fetchone()
+        (players,) = self._db.execute("SELECT players FROM boards WHERE guild_id = ?", (board,)).fetchone()
+        return ahead + 1, row[0], players
+
+    async def rank(self, board: int, user_id: int):
+        return await self._run(self._rank, board, user_id)
+
+
+CLAIM_ROUND = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'answer', ARGV[1], 'started_at', ARGV[2])
+end
+return redis.call('HMGET', KEYS[1], 'answer', 'started_at')
+"""
+
+END_ROUND = """
+if redis.call('HGET', KEYS[1], 'answer') == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 1
+end
+return 0
+"""
+
+# Each attempts field is "count:updated_at", so a player's counter expires
+# attempts_ttl after their own last miss, as in the other backends. The key's
+# EXPIRE only clears out rounds nobody has guessed in for that long.
+RECORD_MISS = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 0
+end
+local count = 1
+local entry = redis.call('HGET', KEYS[1], ARGV[1])
+if entry then
+    local previous, updated_at = string.match(entry, '^(%d+):(.+)$')
+    if previous and tonumber(updated_at) >= tonumber(ARGV[4]) - tonumber(ARGV[3]) then
+        count = tonumber(previous) + 1
+    end
+end
+if count >= tonumber(ARGV[2]) then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[1], count .. ':' .. ARGV[4])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return count
+"""
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend(StateBackend):
+    # Shared state on any server speaking the Redis protocol. Commands are
+    # pipelined over one connection and each state change is a Lua script,
+    # so it is atomic on the server without any client-side locking. A lost
+    # connection fails the commands in flight and is reopened by the next one.
+
+    def __init__(self, url: str = "redis://localhost:6379/0", attempts_ttl: float = 3600, prefix: str = "gts"):
+        self.url = urlparse(url)
+        self.attempts_ttl = attempts_ttl
+        self.prefix = prefix
+        self._reader = None
+        self._writer = None
+        self._replies = None
+        self._pending = deque()
+        self._connecting = asyncio.Lock()
+        self._closed = False
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.url.hostname or "localhost", self.url.port or 6379)
+        self._replies = asyncio.create_task(self._read_replies())
+        if self.url.password:
+            await self.execute("AUTH", *([self.url.username] if self.url.username else []), self.url.password)
+        database = self.url.path.lstrip("/")
+        if database:
+            await self.execute("SELECT", database)
+
+    async def _ensure_connected(self):
+        if self._replies is not None and not self._replies.done():
+            return
+        if self._closed:
+            raise ConnectionError("Redis backend is closed")
+        async with self._connecting:
+            if self._replies is not None and not self._replies.done():
+                return
+            if self._writer is not None:
+                self._writer.close()
+            await self._connect()
+
+    async def start(self):
+        self._closed = False
+        await self._ensure_connected()
+
+    async def close(self):
+        self._closed = True
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._replies.cancel()
+            self._writer = None
+
+    async def _read_reply(self):
+        line = await self._reader.readuntil(b"\r\n")
+        kind, value = line[:1], line[1:-2]
+        if kind == b"+":
+            return value.decode()
+        if kind == b"-":
+            return RedisError(value.decode())
+        if kind == b":":
+            return int(value)
+        if kind == b"$":
+            if value == b"-1":
+                return None
+            data = await self._reader.readexactly(int(value) + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            if value == b"-1":
+                return None
+            return [await self._read_reply() for _ in range(int(value))]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def _read_replies(self):
+        # Whatever stops this loop (EOF, a reset, a garbled reply, close()),
+        # nothing else will answer the commands in flight, so fail them all.
+        error = ConnectionError("Redis connection closed")
+        try:
+            while True:
+                reply = await self._read_reply()
+                future = self._pending.popleft()
+                # The caller may have given up (e.g. timed out) meanwhile.
+                if not future.done():
+                    future.set_result(reply)
+        except Exception as lost:
+            error = ConnectionError(f"Redis connection lost: {lost!r}")
+        finally:
+            while self._pending:
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_exception(error)
+
+    async def execute(self, *args):
+        await self._ensure_connected()
+        encoded = [str(arg).encode() for arg in args]
+        command = b"".join([b"*%d\r\n" % len(encoded), *(b"$%d\r\n%s\r\n" % (len(arg), arg) for arg in encoded)])
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._writer.write(command)
+        reply = await future
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    def _keys(self, key: tuple) -> tuple:
+        scope = f"{self.prefix}:{key[0]}:{key[1]}"
+        return f"{scope}:round", f"{scope}:attempts"
+
+    async def get_round(self, key: tuple):
+        answer, started_at = await self.execute("HMGET", self._keys(key)[0], "answer", "started_at")
+        return (json.loads(answer), float(started_at)) if answer is not None else None
+
+    async def claim_round(self, key: tuple, answer, started_at: float) -> tuple:
+        answer, started_at = await self.execute("EVAL", CLAIM_ROUND, 1, self._keys(key)[0], json.dumps(answer), repr(started_at))
+        return json.loads(answer), float(started_at)
+
+    async def end_round(self, key: tuple, answer) -> bool:
+        return bool(await self.execute("EVAL", END_ROUND, 2, *self._keys(key), json.dumps(answer)))
+
+    async def record_miss(self, key: tuple, user_id: int, limit: int) -> int:
+        return await self.execute(
+            "EVAL", RECORD_MISS, 2, *reversed(self._keys(key)), user_id, limit, int(self.attempts_ttl), repr(time.time())
+        )
+
+    # Each board is a sorted set, which Redis already ranks in O(log n). It
+    # holds negated scores under zero-padded user ids, so ascending order is
+    # best first with ties by user id, the same as the other backends.
+
+    async def award(self, guild_id: int, user_id: int, points: int):
+        boards = {GLOBAL, guild_id or GLOBAL}
+        await asyncio.gather(*(
+            self.execute("ZINCRBY", f"{self.prefix}:scores:{board}", -points, f"{user_id:020d}") for board in boards
+        ))
+
+    async def top(self, board: int, limit: int) -> list:
+        reply = await self.execute("ZRANGE", f"{self.prefix}:scores:{board}", 0, limit - 1, "WITHSCORES")
+        return [(int(user_id), -int(float(score))) for user_id, score in zip(reply[::2], reply[1::2])]
+
+    async def rank(self, board: int, user_id: int):
+        key = f"{self.prefix}:scores:{board}"
+        score = await self.execute("ZSCORE", key, f"{user_id:020d}")
+        if score is None:
+            return None
+        ahead, players = await asyncio.gather(self.execute("ZCOUNT", key, "-inf", f"({score}"), self.execute("ZCARD", key))
+        return ahead + 1, -int(float(score)), players
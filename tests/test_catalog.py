@@ -0,0 +1,46 @@
+import pytest
+
+from answers import AnswerIndex
+from catalog import Catalog, Track, answer_columns, write_catalog
+
+TRACKS = [
+    Track("a", "Hello (feat. Someone)", "Artist", ("Hello!", "Hallo"), ("line one", "line two"), 80),
+    Track("b", "Yesterday - Remastered 2009", "Other", (), (), 0),
+]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    write_catalog(path, TRACKS)
+    return Catalog(path)
+
+
+def test_tracks_round_trip(catalog):
+    assert list(catalog) == TRACKS
+    assert catalog.title(1) == "Yesterday - Remastered 2009"
+    assert catalog.popularity(0) == 80
+
+
+def test_answers_are_stored_normalized(catalog):
+    assert catalog.answers(0) == ("hello", "hallo")
+    assert catalog.answers(1) == ("yesterday",)
+    assert list(answer_columns(catalog)) == list(answer_columns(TRACKS))
+
+
+def test_index_from_columns_matches_index_from_tracks(catalog):
+    from_tracks, from_columns = AnswerIndex(), AnswerIndex()
+    for index, track in enumerate(TRACKS):
+        from_tracks.add(index, track.title, track.aliases)
+    for index, (answers, _) in enumerate(answer_columns(catalog)):
+        from_columns.add_normalized(index, answers)
+    assert dict(from_columns.items()) == dict(from_tracks.items())
+
+
+def test_rejects_other_versions(tmp_path, catalog):
+    path = tmp_path / "old.bin"
+    data = bytearray((tmp_path / "catalog.bin").read_bytes())
+    data[4] = 1
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        Catalog(str(path))
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from catalog import Track
+from lyrics import ClueCache, ClueService, FixtureProvider, make_clues
+
+LYRICS = "\n".join(f"line {n}" for n in range(1, 7))
+
+
+def test_make_clues_spreads_windows_across_the_song():
+    assert make_clues(LYRICS, "Title", count=3, lines=2) == ("line 1\nline 2", "line 3\nline 4", "line 5\nline 6")
+
+
+def test_make_clues_spreads_windows_when_few_lines():
+    # Four windows for three clues: first, middle and last, not 0, 1 and 2.
+    lyrics = "\n".join(f"line {n}" for n in range(1, 6))
+    assert make_clues(lyrics, "Title", count=3, lines=2) == ("line 1\nline 2", "line 3\nline 4", "line 4\nline 5")
+    assert make_clues("only line\nsecond line", "Title", count=3, lines=2) == ("only line\nsecond line",)
+    assert make_clues("", "Title") == ()
+
+
+def test_make_clues_hides_headers_and_the_title():
+    lyrics = "[Chorus]\nHello darkness\nmy old friend\nSay hello darkness again\nI've come to talk"
+    clues = make_clues(lyrics, "Hello Darkness", count=1, lines=2)
+    assert clues == ("my old friend\nI've come to talk",)
+
+
+def test_clue_cache_tiers(tmp_path):
+    path = str(tmp_path / "clues.db")
+    cache = ClueCache(path, max_entries=1)
+    cache.put("a", ("one",))
+    cache.put("b", ("two",))
+    # Only the newest entry stays in memory; the other is still on disk.
+    assert cache.memory("a") is None
+    assert cache.memory("b") == ("two",)
+    assert "a" in cache
+    assert cache.get("a") == ("one",)
+    assert cache.memory("a") == ("one",)
+    cache.close()
+
+    reopened = ClueCache(path)
+    assert reopened.get("b") == ("two",)
+    assert reopened.get("missing") is None
+    reopened.close()
+
+
+def test_clue_cache_evicts_least_recently_used_rows(tmp_path):
+    row = len(json.dumps(["x" * 100]))
+    # One memory entry, so get("a") below refreshes the row on disk.
+    cache = ClueCache(str(tmp_path / "clues.db"), max_bytes=2 * row, max_entries=1)
+    cache.put("a", ("x" * 100,))
+    cache.put("b", ("x" * 100,))
+    cache.get("a")
+    cache.put("c", ("x" * 100,))
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    cache.close()
+
+
+def test_clue_service_fills_from_fixtures(tmp_path):
+    fixtures = tmp_path / "lyrics.json"
+    fixtures.write_text(json.dumps({"t1": LYRICS}))
+    cache = ClueCache(str(tmp_path / "clues.db"))
+    service = ClueService(cache, FixtureProvider(str(fixtures)))
+    fetched = Track("t1", "Title")
+    shipped = Track("t2", "Other", snippets=("from the catalog",))
+    unknown = Track("t3", "Nobody")
+
+    async def scenario():
+        assert await service.clues(fetched) == ()
+        service.prefetch(fetched)
+        await asyncio.gather(*service._pending.values())
+        assert await service.clues(fetched) == make_clues(LYRICS, "Title")
+
+        await service.precompute([shipped, unknown])
+        assert cache.get("t2") == ("from the catalog",)
+        assert cache.get("t3") is None
+        assert await service.clues(unknown) == ()
+
+    asyncio.run(scenario())
+    cache.close()
+
+
+def test_precompute_without_a_provider_does_nothing(tmp_path):
+    cache = ClueCache(str(tmp_path / "clues.db"))
+    service = ClueService(cache)
+    asyncio.run(service.precompute([Track("t1", "Title", snippets=("line",))]))
+    assert "t1" not in cache
+    assert asyncio.run(service.clues(Track("t1", "Title", snippets=("line",)))) == ("line",)
+    cache.close()
@@ -0,0 +1,57 @@
+from answers import AnswerIndex
+from matching import Matcher, edit_distance
+
+
+def crowded_index(size=3000):
+    index = AnswerIndex()
+    for key in range(size):
+        index.add(key, f"love song {key}")
+    index.add(size, "love song", ["the love song"])
+    return index
+
+
+def test_edit_distance_counts_swaps_once():
+    assert edit_distance("love snog", "love song", 2) == 1
+    assert edit_distance("abc", "abc", 0) == 0
+    assert edit_distance("abcdef", "a", 2) == 3
+
+
+def test_exact_alias_matches():
+    matcher = Matcher(crowded_index(10))
+    assert matcher.matches("The Love Song!", 10)
+    assert matcher.matches("love song 3", 3)
+    assert not matcher.matches("love song 31", 10)
+
+
+def test_near_miss_matches_answer_in_crowded_catalog():
+    size = 3000
+    matcher = Matcher(crowded_index(size))
+    assert matcher.matches("love snog", size)
+    assert matcher.matches("the love snog", size)
+    assert not matcher.matches("hate song", size)
+
+
+def test_empty_guess_never_matches():
+    assert not Matcher(crowded_index(10)).matches("!!", 10)
+
+
+def test_match_resolves_typos_to_keys():
+    index = AnswerIndex()
+    index.add(0, "Bohemian Rhapsody")
+    index.add(1, "Yesterday")
+    matcher = Matcher(index)
+    assert matcher.match("bohemian rapsody") == (0,)
+    assert matcher.match("something else entirely") == ()
+
+
+def test_postings_wait_for_first_match():
+    matcher = Matcher(crowded_index(10))
+    assert matcher.matches("love snog", 10)
+    assert matcher._postings is None
+    assert matcher.match("love snog") == (10,)
+    assert matcher._postings is not None
+
+
+def test_answers_callable_replaces_the_key_map():
+    matcher = Matcher(AnswerIndex(), answers={7: ("yesterday",)}.get)
+    assert matcher.matches("Yesterdy", 7)
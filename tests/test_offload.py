@@ -0,0 +1,33 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from answers import AnswerIndex
+from offload import MatchPool
+
+
+def crash():
+    os._exit(1)
+
+
+def test_match_pool_scores_guesses_and_survives_a_dead_worker():
+    index = AnswerIndex()
+    index.add(0, "Bohemian Rhapsody")
+    index.add(1, "Yesterday")
+    pool = MatchPool(2)
+    try:
+        pool.load(index)
+
+        async def main():
+            assert await asyncio.gather(
+                pool.matches("bohemian rapsody", 0), pool.matches("yesterday", 1), pool.matches("yesterday", 0)
+            ) == [True, True, False]
+            with pytest.raises(BrokenProcessPool):
+                await asyncio.wrap_future(pool._executor.submit(crash))
+            assert await asyncio.wait_for(pool.matches("yesterdy", 1), 10)
+
+        asyncio.run(main())
+    finally:
+        pool.close()
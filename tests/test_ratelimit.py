@@ -0,0 +1,59 @@
+from ratelimit import RateLimiter, TokenBuckets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def limiter(clock, user_burst=2, guild_burst=1):
+    limiter = RateLimiter(1.0, user_burst, 1.0, guild_burst)
+    limiter.users.clock = limiter.guilds.clock = clock
+    return limiter
+
+
+def test_bucket_refills_over_time():
+    clock = Clock()
+    buckets = TokenBuckets(1.0, 1, clock)
+    assert buckets.allow("a")
+    assert not buckets.allow("a")
+    clock.now = 1.0
+    assert buckets.allow("a")
+
+
+def test_check_does_not_spend():
+    buckets = TokenBuckets(1.0, 1, Clock())
+    assert buckets.check("a")
+    assert buckets.check("a")
+    assert buckets.allow("a")
+    assert not buckets.check("a")
+
+
+def test_guild_refusal_leaves_user_tokens_alone():
+    clock = Clock()
+    rates = limiter(clock)
+    assert rates.allow(1, 10)
+    # The guild is out of tokens; user 1 still has one left.
+    assert not rates.allow(1, 10)
+    assert not rates.allow(1, 10)
+    assert rates.allow(1, None)
+
+
+def test_user_refusal_leaves_guild_tokens_alone():
+    clock = Clock()
+    rates = limiter(clock, user_burst=1)
+    assert rates.allow(1, None)
+    assert not rates.allow(1, 10)
+    assert rates.allow(2, 10)
+
+
+def test_full_buckets_are_dropped():
+    clock = Clock()
+    buckets = TokenBuckets(1.0, 2, clock)
+    buckets.allow("a")
+    clock.now = 2.0
+    buckets.allow("b")
+    assert len(buckets) == 1
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from settings import ConfigError, Secret, load_settings
+
+
+def write(tmp_path, values):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(values))
+    return str(path)
+
+
+def test_environment_overrides_and_secret_files(tmp_path):
+    token = tmp_path / "token"
+    token.write_text("from-file\n")
+    path = write(tmp_path, {"DISCORD_TOKEN": "from-config", "USER_GUESS_RATE": 1, "SHARDED": False})
+    settings = load_settings(path, environ={"DISCORD_TOKEN_FILE": str(token), "SHARDED": "yes"})
+    assert settings.discord_token.reveal() == "from-file"
+    assert "from-file" not in repr(settings)
+    assert settings.user_guess_rate == 1.0
+    assert settings.sharded is True
+    assert settings.spotify_client_secret == Secret()
+
+
+def test_every_problem_is_reported_at_once(tmp_path):
+    path = write(tmp_path, {"STATE_BACKEND": "mongo", "BOGUS": 1, "SPOTIFY_RATE": "fast"})
+    with pytest.raises(ConfigError) as raised:
+        load_settings(path, environ={})
+    message = str(raised.value)
+    for problem in ("unknown key BOGUS", "SPOTIFY_RATE must be float", "STATE_BACKEND must be one of", "DISCORD_TOKEN is required"):
+        assert problem in message
+
+
+@pytest.mark.parametrize("key, value", [
+    ("USER_GUESS_RATE", 0),
+    ("SPOTIFY_RATE", 0),
+    ("SPOTIFY_BURST", 0),
+    ("ROUND_DURATION", -1),
+    ("GUILD_GUESS_BURST", -1),
+    ("GUILD_GUESS_BURST", 0),
+    ("USER_GUESS_BURST", 0),
+    ("USER_GUESS_BURST", 0.5),
+    ("GUESS_QUEUE_SIZE", 0),
+    ("MATCH_WORKERS", -1),
+    ("MATCH_SIMILARITY", 3),
+    ("MATCH_SIMILARITY", 0),
+])
+def test_out_of_range_values_are_rejected(tmp_path, key, value):
+    path = write(tmp_path, {"DISCORD_TOKEN": "x", key: value})
+    with pytest.raises(ConfigError, match=key):
+        load_settings(path, environ={})
@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from catalog import Catalog
+from catalog_builder import CatalogBuilder
+from scheduler import RequestScheduler
+from spotify import SpotifyClient, SpotifyError
+
+
+class StubSpotify:
+    # Just enough of the accounts and Web API endpoints, with queued canned
+    # responses per path and a record of what the client sent.
+
+    def __init__(self):
+        self.token_requests = []
+        self.requests = []
+        self.responses = {}
+        # path -> handler, for responses that depend on the request.
+        self.handlers = {}
+        self.tokens_issued = 0
+        app = web.Application()
+        app.router.add_post("/token", self.token)
+        app.router.add_get("/v1/{path:.*}", self.api)
+        self.server = TestServer(app)
+
+    async def token(self, request):
+        self.token_requests.append(request.headers.get("Authorization"))
+        self.tokens_issued += 1
+        return web.json_response({"access_token": f"token-{self.tokens_issued}", "expires_in": 3600})
+
+    async def api(self, request):
+        self.requests.append((request.path, dict(request.query), request.headers.get("Authorization")))
+        queued = self.responses.get(request.path)
+        if queued:
+            return await queued.pop(0)()
+        handler = self.handlers.get(request.path)
+        if handler is not None:
+            return await handler(request)
+        return web.json_response({"path": request.path, "query": dict(request.query)})
+
+    def client(self, **kwargs):
+        return SpotifyClient(
+            "id", "secret",
+            api_url=str(self.server.make_url("/v1")),
+            token_url=str(self.server.make_url("/token")),
+            **kwargs,
+        )
+
+
+def run(scenario, **client_options):
+    async def main():
+        stub = StubSpotify()
+        await stub.server.start_server()
+        client = stub.client(**client_options)
+        await client.start()
+        try:
+            await scenario(stub, client)
+        finally:
+            await client.close()
+            await stub.server.close()
+
+    asyncio.run(main())
+
+
+def test_token_is_fetched_once_and_sent_as_bearer():
+    async def scenario(stub, client):
+        await client.track("a")
+        await client.track("b")
+        assert len(stub.token_requests) == 1
+        assert stub.token_requests[0].startswith("Basic ")
+        assert [auth for _, _, auth in stub.requests] == ["Bearer token-1", "Bearer token-1"]
+
+    run(scenario)
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return web.json_response({"tracks": [{"id": "a"}]})
+
+    async def scenario(stub, client):
+        stub.responses["/v1/tracks"] = [slow]
+        results = await asyncio.gather(*(client.tracks(["a"]) for _ in range(5)))
+        assert results == [[{"id": "a"}]] * 5
+        assert len(stub.requests) == 1
+
+    run(scenario)
+
+
+def test_rate_limited_requests_wait_and_retry():
+    async def limited():
+        return web.Response(status=429, headers={"Retry-After": "0.05"})
+
+    async def scenario(stub, client):
+        stub.responses["/v1/tracks/a"] = [limited]
+        assert (await client.track("a"))["path"] == "/v1/tracks/a"
+        assert len(stub.requests) == 2
+        assert client.scheduler.stats()["throttled"] == 1
+
+    run(scenario, scheduler=RequestScheduler(rate=100, burst=10))
+
+
+def test_gives_up_after_max_retries():
+    async def limited():
+        return web.Response(status=429, headers={"Retry-After": "0.01"})
+
+    async def scenario(stub, client):
+        stub.responses["/v1/tracks/a"] = [limited] * 3
+        with pytest.raises(SpotifyError) as raised:
+            await client.track("a")
+        assert raised.value.status == 429
+        assert len(stub.requests) == 3
+
+    run(scenario, max_retries=2)
+
+
+def test_expired_token_is_refreshed_once():
+    async def unauthorized():
+        return web.Response(status=401, text="token expired")
+
+    async def scenario(stub, client):
+        stub.responses["/v1/tracks/a"] = [unauthorized]
+        await client.track("a")
+        assert len(stub.token_requests) == 2
+        assert [auth for _, _, auth in stub.requests] == ["Bearer token-1", "Bearer token-2"]
+
+    run(scenario)
+
+
+def test_errors_without_json_bodies_raise_spotify_error():
+    async def broken():
+        return web.Response(status=500, text="<html>oops</html>")
+
+    async def scenario(stub, client):
+        stub.responses["/v1/search"] = [broken]
+        with pytest.raises(SpotifyError) as raised:
+            await client.search_tracks("song")
+        assert raised.value.status == 500
+
+    run(scenario)
+
+
+def test_catalog_builder_skips_ids_spotify_rejects(tmp_path):
+    async def tracks(request):
+        ids = request.query["ids"].split(",")
+        if "bad!" in ids:
+            return web.json_response({"error": {"status": 400, "message": "invalid id"}}, status=400)
+        return web.json_response({"tracks": [
+            {"id": track_id, "name": f"song {track_id}", "artists": [{"name": "someone"}], "popularity": 5}
+            for track_id in ids
+        ]})
+
+    async def scenario(stub, client):
+        stub.handlers["/v1/tracks"] = tracks
+        builder = CatalogBuilder(client, str(tmp_path / "staging"), concurrency=2)
+        ids = [f"id{i}" for i in range(60)]
+        ids.insert(7, "bad!")
+        count = await builder.build(ids, str(tmp_path / "catalog.bin"))
+        assert count == 60
+        catalog = Catalog(str(tmp_path / "catalog.bin"))
+        assert sorted(track.id for track in catalog) == sorted(f"id{i}" for i in range(60))
+        # The rejected id is checkpointed, so a rerun fetches nothing.
+        requests = len(stub.requests)
+        assert await builder.build(ids, str(tmp_path / "catalog.bin")) == 60
+        assert len(stub.requests) == requests
+
+    run(scenario)
@@ -0,0 +1,388 @@
+import asyncio
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import state as state_module
+from attempts import AttemptStore
+from leaderboard import GLOBAL
+from persistence import SCHEMA, GameStore
+from sessions import SessionManager
+from state import CLAIM_ROUND, END_ROUND, RECORD_MISS, MemoryBackend, RedisBackend, SQLiteBackend
+
+KEY = (10, 0)
+OTHER = (11, 0)
+
+
+class StandInRedis:
+    # Speaks enough RESP for RedisBackend: the hash and sorted-set commands
+    # it sends, and EVAL of its three scripts, each mirrored here in Python
+    # since there is no Lua interpreter. fakeredis, when installed, runs the
+    # real scripts as well.
+
+    def __init__(self):
+        self.data = {}
+        self.scripts = {CLAIM_ROUND: self.claim_round, END_ROUND: self.end_round, RECORD_MISS: self.record_miss}
+
+    async def serve(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                args = []
+                for _ in range(int(line[1:])):
+                    size = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(size + 2))[:-2].decode())
+                try:
+                    # DEL is a keyword in Python.
+                    command = "delete" if args[0].lower() == "del" else args[0].lower()
+                    reply = getattr(self, command)(*args[1:])
+                except Exception as error:
+                    reply = error
+                writer.write(self.encode(reply))
+        finally:
+            writer.close()
+
+    def encode(self, reply) -> bytes:
+        if isinstance(reply, Exception):
+            return b"-ERR %s\r\n" % str(reply).encode()
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(map(self.encode, reply))
+        return b"$%d\r\n%s\r\n" % (len(reply.encode()), reply.encode())
+
+    def score(self, value: float) -> str:
+        return f"{value:g}"
+
+    def auth(self, *args):
+        return "OK"
+
+    def select(self, database):
+        return "OK"
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        return int(key in self.data)
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hmget(self, key, *fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hset(self, key, *pairs):
+        fields = self.data.setdefault(key, {})
+        added = sum(name not in fields for name in pairs[::2])
+        fields.update(zip(pairs[::2], pairs[1::2]))
+        return added
+
+    def hdel(self, key, *names):
+        fields = self.data.get(key, {})
+        removed = sum(fields.pop(name, None) is not None for name in names)
+        if not fields:
+            self.data.pop(key, None)
+        return removed
+
+    def zincrby(self, key, increment, member):
+        scores = self.data.setdefault(key, {})
+        scores[member] = scores.get(member, 0.0) + float(increment)
+        return self.score(scores[member])
+
+    def zrange(self, key, start, stop, withscores=None):
+        ranked = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        reply = []
+        for member, score in ranked[int(start):int(stop) + 1]:
+            reply += [member, self.score(score)] if withscores else [member]
+        return reply
+
+    def zscore(self, key, member):
+        score = self.data.get(key, {}).get(member)
+        return self.score(score) if score is not None else None
+
+    def zcount(self, key, low, high):
+        def bound(text):
+            return (float(text[1:]), True) if text.startswith("(") else (float(text), False)
+
+        (low, low_open), (high, high_open) = bound(low), bound(high)
+        return sum(
+            (score > low if low_open else score >= low) and (score < high if high_open else score <= high)
+            for score in self.data.get(key, {}).values()
+        )
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def eval(self, script, key_count, *args):
+        key_count = int(key_count)
+        return self.scripts[script](args[:key_count], args[key_count:])
+
+    def claim_round(self, keys, argv):
+        if not self.exists(keys[0]):
+            self.hset(keys[0], "answer", argv[0], "started_at", argv[1])
+        return self.hmget(keys[0], "answer", "started_at")
+
+    def end_round(self, keys, argv):
+        if self.hget(keys[0], "answer") != argv[0]:
+            return 0
+        self.delete(*keys)
+        return 1
+
+    def record_miss(self, keys, argv):
+        if not self.exists(keys[1]):
+            return 0
+        user_id, limit, ttl, now = argv
+        count = 1
+        entry = self.hget(keys[0], user_id)
+        if entry is not None:
+            previous, _, updated_at = entry.partition(":")
+            if float(updated_at) >= float(now) - float(ttl):
+                count = int(previous) + 1
+        if count >= int(limit):
+            self.hdel(keys[0], user_id)
+        else:
+            self.hset(keys[0], user_id, f"{count}:{now}")
+        return count
+
+
+@pytest.fixture(scope="module")
+def standin_url():
+    # The server runs its own loop on a thread, since each test runs its
+    # scenario under a fresh asyncio.run().
+    async def listen():
+        return await asyncio.start_server(StandInRedis().serve, "127.0.0.1", 0)
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(listen())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}/0"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    yield f"redis://{host}:{port}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis", "fakeredis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend(SessionManager(lambda key: 0))
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "state.db"))
+    # A fresh prefix per test keeps them apart on the shared server.
+    url = request.getfixturevalue("standin_url" if request.param == "redis" else "redis_url")
+    return RedisBackend(url, prefix=f"test{id(request)}")
+
+
+def run(backend, scenario):
+    async def main():
+        await backend.start()
+        try:
+            await scenario(backend)
+        finally:
+            await backend.close()
+
+    asyncio.run(main())
+
+
+def test_claim_round_keeps_the_first_answer(backend):
+    async def scenario(state):
+        assert await state.get_round(KEY) is None
+        assert await state.claim_round(KEY, 3, 100.0) == (3, 100.0)
+        assert await state.claim_round(KEY, 4, 200.0) == (3, 100.0)
+        assert await state.get_round(KEY) == (3, 100.0)
+        assert await state.get_round(OTHER) is None
+
+    run(backend, scenario)
+
+
+def test_end_round_only_ends_the_matching_answer(backend):
+    async def scenario(state):
+        await state.claim_round(KEY, 3, 100.0)
+        assert not await state.end_round(KEY, 4)
+        assert await state.end_round(KEY, 3)
+        assert not await state.end_round(KEY, 3)
+        assert await state.get_round(KEY) is None
+
+    run(backend, scenario)
+
+
+def test_record_miss_counts_up_to_the_limit(backend):
+    async def scenario(state):
+        await state.claim_round(KEY, 3, 100.0)
+        assert [await state.record_miss(KEY, 1, 3) for _ in range(3)] == [1, 2, 3]
+        # Reaching the limit cleared the counter.
+        assert await state.record_miss(KEY, 1, 3) == 1
+        assert await state.record_miss(KEY, 2, 3) == 1
+
+    run(backend, scenario)
+
+
+def test_record_miss_without_a_round_counts_nothing(backend):
+    async def scenario(state):
+        assert await state.record_miss(KEY, 1, 3) == 0
+        await state.claim_round(KEY, 3, 100.0)
+        assert await state.record_miss(KEY, 1, 3) == 1
+
+    run(backend, scenario)
+
+
+def test_attempts_expire_per_player(backend, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(state_module, "time", SimpleNamespace(time=lambda: now[0]))
+    if isinstance(backend, MemoryBackend):
+        backend = MemoryBackend(SessionManager(lambda key: 0, lambda: AttemptStore(ttl=3600, clock=lambda: now[0])))
+
+    async def scenario(state):
+        await state.claim_round(KEY, 3, 100.0)
+        assert await state.record_miss(KEY, 1, 5) == 1
+        now[0] = 3000.0
+        assert await state.record_miss(KEY, 2, 5) == 1
+        # Player 2's miss must not keep player 1's counter alive.
+        now[0] = 4700.0
+        assert await state.record_miss(KEY, 1, 5) == 1
+        assert await state.record_miss(KEY, 2, 5) == 2
+
+    run(backend, scenario)
+
+
+def test_end_round_clears_attempts(backend):
+    async def scenario(state):
+        await state.claim_round(KEY, 3, 100.0)
+        await state.record_miss(KEY, 1, 3)
+        await state.record_miss(KEY, 1, 3)
+        await state.end_round(KEY, 3)
+        await state.claim_round(KEY, 5, 200.0)
+        assert await state.record_miss(KEY, 1, 3) == 1
+
+    run(backend, scenario)
+
+
+def test_leaderboards(backend):
+    async def scenario(state):
+        await state.award(10, 1, 1)
+        await state.award(10, 2, 1)
+        await state.award(10, 2, 1)
+        await state.award(11, 1, 1)
+        await state.award(None, 3, 2)
+
+        assert await state.top(10, 10) == [(2, 2), (1, 1)]
+        assert await state.top(GLOBAL, 10) == [(1, 2), (2, 2), (3, 2)]
+        assert await state.top(GLOBAL, 1) == [(1, 2)]
+        assert await state.top(12, 10) == []
+
+        assert await state.rank(10, 1) == (2, 1, 2)
+        assert await state.rank(11, 1) == (1, 1, 1)
+        # Ties share a rank.
+        assert await state.rank(GLOBAL, 3) == (1, 2, 3)
+        assert await state.rank(10, 3) is None
+
+    run(backend, scenario)
+
+
+def test_memory_backend_persists_through_game_store(tmp_path):
+    path = str(tmp_path / "game.db")
+
+    async def scenario():
+        store = GameStore(path)
+        state = MemoryBackend(SessionManager(lambda key: 0), store)
+        await state.claim_round(KEY, 3, 100.0)
+        await state.record_miss(KEY, 1, 3)
+        await state.award(10, 1, 2)
+        await store.flush()
+        store.close()
+
+    asyncio.run(scenario())
+    store = GameStore(path)
+    assert store.load(3600) == [(KEY, 3, 100.0, [(1, 1)])]
+    assert sorted(store.load_scores()) == [(GLOBAL, 1, 2), (10, 1, 2)]
+    store.close()
+
+
+def test_game_stores_sharing_a_file_add_up_scores(tmp_path):
+    path = str(tmp_path / "game.db")
+
+    async def scenario():
+        # Two cluster workers, each winning in a guild the other doesn't own.
+        first, second = GameStore(path), GameStore(path)
+        await MemoryBackend(SessionManager(lambda key: 0), first).award(10, 1, 2)
+        await MemoryBackend(SessionManager(lambda key: 0), second).award(20, 1, 3)
+        await first.flush()
+        await second.flush()
+        first.close()
+        second.close()
+
+    asyncio.run(scenario())
+    store = GameStore(path)
+    assert sorted(store.load_scores()) == [(GLOBAL, 1, 5), (10, 1, 2), (20, 1, 3)]
+    store.close()
+
+
+def test_sqlite_backend_counts_players_per_board(tmp_path):
+    path = str(tmp_path / "game.db")
+    # A database written before the boards table existed.
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA.split("CREATE TABLE IF NOT EXISTS boards")[0])
+    db.executemany("INSERT INTO scores VALUES (?, ?, ?)", [(10, 1, 5), (10, 2, 3), (20, 1, 1)])
+    db.commit()
+    db.close()
+
+    async def scenario(state):
+        assert await state.rank(10, 2) == (2, 3, 2)
+        await state.award(10, 2, 1)
+        await state.award(10, 3, 1)
+        assert await state.rank(10, 3) == (3, 1, 3)
+        assert await state.rank(20, 1) == (1, 1, 1)
+        assert await state.rank(GLOBAL, 3) == (1, 1, 2)
+
+    run(SQLiteBackend(path), scenario)
+
+
+def test_redis_backend_reconnects_after_the_server_drops_it():
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        while line := await reader.readline():
+            for _ in range(int(line[1:])):
+                await reader.readline()
+                await reader.readline()
+            if len(connections) == 1:
+                writer.close()
+                return
+            writer.write(b"*2\r\n$-1\r\n$-1\r\n")
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        state = RedisBackend(f"redis://127.0.0.1:{port}")
+        await state.start()
+        with pytest.raises(ConnectionError):
+            await state.get_round(KEY)
+        assert await asyncio.wait_for(state.get_round(KEY), 5) is None
+        assert len(connections) == 2
+        await state.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+import asyncio
+
+
+class WorkerPool:
+    # A fixed number of tasks draining a bounded queue. submit() never waits:
+    # when the queue is full the job is dropped, so a burst can't pile up
+    # unbounded work behind the event loop. Each job gets `timeout` seconds.
+
+    def __init__(self, size: int = 32, queue_size: int = 1000, timeout: float = 10.0, on_timeout=None, results=None):
+        self.size = size
+        self.timeout = timeout
+        # Called with the job's arguments when it times out.
+        self.on_timeout = on_timeout
+        # Optional metrics.Counter, labelled done, failed, timeout or dropped.
+        self.results = results
+        self._queue = asyncio.Queue(queue_size)
+        self._workers = []
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def _count(self, result: str):
+        if self.results is not None:
+            self.results.inc(result)
+
+    def submit(self, job, *args) -> bool:
+        try:
+            self._queue.put_nowait((job, args))
+        except asyncio.QueueFull:
+            self._count("dropped")
+            return False
+        return True
+
+    async def _work(self):
+        while True:
+            job, args = await self._queue.get()
+            try:
+                await asyncio.wait_for(job(*args), self.timeout)
+                self._count("done")
+            except asyncio.TimeoutError:
+                self._count("timeout")
+                if self.on_timeout is not None:
+                    await self._recover(args)
+            except Exception as error:
+                self._count("failed")
+                print(f"Background job {getattr(job, '__name__', job)} failed: {error!r}")
+            finally:
+                self._queue.task_done()
+
+    async def _recover(self, args):
+        try:
+            await self.on_timeout(*args)
+        except Exception as error:
+            print(f"Timeout handler failed: {error!r}")
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.size)]
+
+    async def join(self):
+        await self._queue.join()
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []